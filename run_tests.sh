@@ -14,6 +14,58 @@ print_message () {
     echo -e "${left_filler_len// /$symbol}$message${right_filler_len// /$symbol}\033[0m"
 }
 
+# --parallel runs both projects at the same time, see run_parallel.
+# --test-settings selects the settings_test modules of the projects.
+parallel=
+settings_module=settings
+for arg in "$@"; do
+    case $arg in
+        --parallel) parallel=1 ;;
+        --test-settings) settings_module=settings_test ;;
+    esac
+done
+news_settings="${DJANGO_SETTINGS_MODULE:-yanews.$settings_module}"
+note_settings="yanote.$settings_module"
+
+run_parallel () {
+    # Run both projects at the same time, each spread across worker processes
+    # with pytest-xdist. Every worker gets its own SQLite test database, every
+    # project runs in its own subshell with its own settings module.
+    # The number of workers per project is TEST_WORKERS, by default half of the cores.
+    local cores=$(python -c "import os; print(os.cpu_count() or 1)")
+    local workers=${TEST_WORKERS:-$(( cores / 2 > 1 ? cores / 2 : 1 ))}
+    local news_log=$(mktemp)
+    local note_log=$(mktemp)
+    (
+        cd ya_news
+        export DJANGO_SETTINGS_MODULE="$news_settings"
+        pytest --tb=line -n "$workers"
+    ) > "$news_log" 2>&1 &
+    local news_pid=$!
+    (
+        cd ya_note
+        export DJANGO_SETTINGS_MODULE="$note_settings"
+        pytest --tb=line -n "$workers"
+    ) > "$note_log" 2>&1 &
+    local note_pid=$!
+    wait $news_pid
+    local news_status=$?
+    wait $note_pid
+    local note_status=$?
+    cat "$news_log" "$note_log" 1>&2
+    rm -f "$news_log" "$note_log"
+    if [[ $news_status -ne 0 ]]; then
+        print_message " При запуске упали ваши тесты для проекта YaNews. Проверьте тесты этого проекта " "=" 1
+    fi
+    if [[ $note_status -ne 0 ]]; then
+        print_message " При запуске упали ваши тесты для проекта YaNote. Проверьте тесты этого проекта " "=" 1
+    fi
+    if [[ $news_status -ne 0 || $note_status -ne 0 ]]; then
+        echo \`\`\` 1>&2
+        return $(( news_status != 0 ? news_status : note_status ))
+    fi
+}
+
 
 if python -m flake8 --config=setup.cfg 1>&2;
 then
@@ -21,13 +73,16 @@ then
     echo $LF 1>&2
     if python structure_test.py
     then
+        if [[ -n "$parallel" ]]; then
+            run_parallel
+            exit $?
+        fi
         cd ya_news
-        export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
+        export DJANGO_SETTINGS_MODULE="$news_settings"
         if pytest --tb=line 1>&2;
         then
             cd ../ya_note
-            unset DJANGO_SETTINGS_MODULE
-            export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings"}"
+            export DJANGO_SETTINGS_MODULE="$note_settings"
             if pytest --tb=line 1>&2;
             then
                 exit 0
@@ -10,6 +10,13 @@ class CommentInline(admin.StackedInline):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
+    readonly_fields = ('comment_count',)
     inlines = [
         CommentInline,
     ]
+
+    def save_related(self, request, form, formsets, change):
+        """После сохранения инлайна комментариев пересчитываем счётчик."""
+        super().save_related(request, form, formsets, change)
+        News.objects.filter(pk=form.instance.pk).recount_comments()
@@ -0,0 +1,246 @@
+import asyncio
+import itertools
+import json
+import socket
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from .models import Comment, News, make_excerpt
+
+# Пространства имён, которые не относятся к проекту.
+SKIPPED_NAMESPACES = ('admin',)
+PERCENTILES = (50, 90, 95, 99)
+
+
+def generate_dataset(news_count, comments_per_news, users=10, batch_size=5000):
+    """
+    Создаёт авторов, новости и комментарии через bulk_create.
+
+    Даты новостей идут по убыванию с шагом в день, комментарии
+    распределены по авторам по кругу. Возвращает первого автора.
+    """
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        user_model(username=f'bench-{index}') for index in range(users)
+    )
+    authors = list(
+        user_model.objects.filter(username__startswith='bench-')
+        .order_by('id').values_list('id', flat=True)
+    )
+    today = timezone.localdate()
+
+    def make_news(index):
+        text = f'Текст новости номер {index}. ' * 10
+        return News(
+            title=f'Новость {index}',
+            text=text,
+            excerpt=make_excerpt(text),
+            date=today - timedelta(days=index),
+        )
+
+    for start in range(0, news_count, batch_size):
+        News.objects.bulk_create(
+            make_news(index)
+            for index in range(start, min(start + batch_size, news_count))
+        )
+    comments = []
+    for news_id in News.objects.values_list('id', flat=True).iterator():
+        for index in range(comments_per_news):
+            comments.append(Comment(
+                news_id=news_id,
+                author_id=authors[index % len(authors)],
+                text=f'Комментарий {index}',
+            ))
+        if len(comments) >= batch_size:
+            Comment.objects.bulk_create(comments)
+            comments = []
+    Comment.objects.bulk_create(comments)
+    News.objects.recount_comments()
+    return user_model.objects.get(pk=authors[0])
+
+
+def named_urls(patterns=None, namespace=None):
+    """Все имена маршрутов проекта вида namespace:name."""
+    names = set()
+    for pattern in patterns or get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in SKIPPED_NAMESPACES:
+                continue
+            names |= named_urls(
+                pattern.url_patterns, pattern.namespace or namespace
+            )
+        elif pattern.name:
+            names.add(f'{namespace}:{pattern.name}' if namespace else
+                      pattern.name)
+    return names
+
+
+def url_cases(author):
+    """
+    Сценарии замера: ключ, имя маршрута, аргументы и клиент.
+
+    Страницы, которые анонимам отдаются из кеша, замеряются ещё
+    и для авторизованного пользователя.
+    """
+    news = News.objects.first()
+    comment = Comment.objects.filter(author=author).first()
+    return (
+        ('news:home', 'news:home', None, 'anonymous'),
+        ('news:home@author', 'news:home', None, 'author'),
+        ('news:archive', 'news:archive', None, 'anonymous'),
+        ('news:detail', 'news:detail', (news.pk,), 'anonymous'),
+        ('news:detail@author', 'news:detail', (news.pk,), 'author'),
+        ('news:comments', 'news:comments', (news.pk,), 'anonymous'),
+        ('news:edit', 'news:edit', (comment.pk,), 'author'),
+        ('news:delete', 'news:delete', (comment.pk,), 'author'),
+        ('news:home_async', 'news:home_async', None, 'anonymous'),
+        ('news:home_async@author', 'news:home_async', None, 'author'),
+        ('news:detail_async', 'news:detail_async', (news.pk,), 'anonymous'),
+        (
+            'news:detail_async@author', 'news:detail_async', (news.pk,),
+            'author',
+        ),
+        ('users:login', 'users:login', None, 'anonymous'),
+        ('users:logout', 'users:logout', None, 'anonymous'),
+        ('users:signup', 'users:signup', None, 'anonymous'),
+        ('metrics', 'metrics', None, 'author'),
+    )
+
+
+def percentiles(durations):
+    """Процентили PERCENTILES; при одном замере все равны ему."""
+    if len(durations) > 1:
+        cuts = statistics.quantiles(durations, n=100, method='inclusive')
+    else:
+        cuts = durations * 99
+    return {
+        f'p{percentile}': round(cuts[percentile - 1], 3)
+        for percentile in PERCENTILES
+    }
+
+
+def measure_url(client, url, requests, warmup):
+    """Задержки запросов в миллисекундах и пропускная способность."""
+    durations = []
+    for number in range(warmup + requests):
+        started = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        duration = time.perf_counter() - started
+        if response.status_code >= 500:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        if number >= warmup:
+            durations.append(duration * 1000)
+    result = percentiles(durations)
+    result['mean'] = round(statistics.fmean(durations), 3)
+    result['rps'] = round(1000 * len(durations) / sum(durations), 1)
+    result['status'] = response.status_code
+    return result
+
+
+def run_benchmark(author, requests, warmup):
+    clients = {'anonymous': Client(), 'author': Client()}
+    clients['author'].force_login(author)
+    return {
+        key: measure_url(
+            clients[client], reverse(name, args=args), requests, warmup
+        )
+        for key, name, args, client in url_cases(author)
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Сервер не запустился на порту {port}.')
+
+
+async def http_get(reader, writer, request):
+    """Запрос по открытому соединению keep-alive, возвращает статус."""
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(
+        line.lower().split(': ', 1) for line in lines[1:] if line
+    )
+    if 'content-length' not in headers:
+        raise RuntimeError('Ответ без Content-Length.')
+    await reader.readexactly(int(headers['content-length']))
+    return int(lines[0].split()[1])
+
+
+async def load_test(port, paths, requests, concurrency, cookies=''):
+    """
+    Отправляет запросы с concurrency соединений keep-alive одновременно.
+
+    Пути берутся из paths по кругу. Возвращает задержки в миллисекундах,
+    число ответов не 200 и общее время в секундах.
+    """
+    paths = itertools.cycle(paths)
+    remaining = itertools.count(requests, -1)
+    durations, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while next(remaining) > 0:
+                request = (
+                    f'GET {next(paths)} HTTP/1.1\r\nHost: localhost\r\n'
+                    f'Cookie: {cookies}\r\n\r\n'
+                ).encode()
+                started = time.perf_counter()
+                status = await http_get(reader, writer, request)
+                durations.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return durations, errors, time.perf_counter() - started
+
+
+def summarize(durations, errors, elapsed):
+    result = percentiles(durations)
+    result['rps'] = round(len(durations) / elapsed, 1)
+    result['errors'] = errors
+    return result
+
+
+def compare(results, baseline_path):
+    """Строки сравнения p50 и p95 с результатами из другого прогона."""
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = json.load(file)['urls']
+    lines = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            lines.append(f'{key}: нет в {baseline_path}')
+            continue
+        changes = ', '.join(
+            f'{metric} {previous[metric]:.2f} → {current[metric]:.2f} мс '
+            f'({(current[metric] / previous[metric] - 1) * 100:+.0f}%)'
+            for metric in ('p50', 'p95')
+        )
+        lines.append(f'{key}: {changes}')
+    return lines
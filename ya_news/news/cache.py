@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+
+from .replicas import read_from_primary
+from .sync import run_sync
+
+
+def get_cache():
+    """Кеш для страниц YaNews, выбирается в настройках проекта."""
+    return caches[settings.NEWS_CACHE_ALIAS]
+
+
+def page_cache_key(name, *args):
+    return ':'.join(('news', 'page', name, *map(str, args)))
+
+
+def invalidate_news_pages(*news_ids):
+    """
+    Удаляет из кеша страницы, на которых видны указанные новости.
+
+    Удаление откладывается до фиксации транзакции, иначе параллельный
+    запрос успеет положить в кеш ещё не изменённые данные.
+    """
+    keys = [page_cache_key('home'), page_cache_key('archive')]
+    keys += [page_cache_key('detail', news_id) for news_id in news_ids]
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+class AnonymousCacheMixin:
+    """
+    Кеширует ответы анонимным пользователям.
+
+    Кешируются только GET-запросы без параметров: страницы с курсорами
+    пагинации собираются заново. Ключ строится из cache_name и аргументов
+    маршрута, так что его можно сбросить через invalidate_news_pages.
+    Страница для кеша строится по данным из default, а не из реплики:
+    сброшенный ключ не должен заполниться отстающей копией.
+    """
+    cache_name = None
+
+    def get_cache_key(self):
+        return page_cache_key(self.cache_name, *self.kwargs.values())
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method != 'GET'
+            or request.GET
+            or request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key()
+        response = cache.get(key)
+        if response is not None:
+            return get_conditional_response(
+                request, etag=response.get('ETag'), response=response
+            )
+        with read_from_primary():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200:
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key, rendered, settings.NEWS_CACHE_TIMEOUT
+                    )
+                )
+                # Ленивые запросы шаблона тоже должны уйти в default.
+                response.render()
+        return response
+
+
+async def cached_for_anonymous(request, key, get_response):
+    """
+    Асинхронный вариант AnonymousCacheMixin для функций-представлений.
+
+    get_response — корутина, которая строит ответ. Пользователь и кеш
+    читаются через run_sync: обращение к ним может уйти в БД.
+    """
+    is_authenticated = await run_sync(lambda: request.user.is_authenticated)
+    if request.method != 'GET' or request.GET or is_authenticated:
+        return await get_response()
+    cache = get_cache()
+    response = await run_sync(cache.get, key)
+    if response is not None:
+        return response
+    with read_from_primary():
+        response = await get_response()
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, rendered, settings.NEWS_CACHE_TIMEOUT
+                )
+            )
+            await run_sync(response.render)
+    return response
@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+
+
+class WordMatcher:
+    """
+    Автомат Ахо — Корасик для поиска запрещённых слов.
+
+    Строится один раз по словарю и проверяет текст за один проход,
+    время проверки не зависит от количества слов в словаре.
+    """
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [False]
+        for word in words:
+            self._add(word.lower())
+        self._link()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(False)
+            state = next_state
+        self._terminal[state] = True
+
+    def _link(self):
+        """Проставляет суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._terminal[self._fail[next_state]]:
+                    self._terminal[next_state] = True
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно слово из словаря."""
+        goto, fail, terminal = self._goto, self._fail, self._terminal
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
+class BadWordsFilter:
+    """
+    Проверка текста по встроенным словам и словарю из файла.
+
+    Путь к словарю (по слову на строку) задаётся настройкой BAD_WORDS_FILE.
+    При изменении файла автомат пересобирается при следующей проверке,
+    поэтому обновить словарь можно без перезапуска процессов.
+    """
+
+    def __init__(self, words):
+        self._words = tuple(words)
+        self._lock = threading.Lock()
+        self._source = None
+        self._matcher = WordMatcher(self._words)
+
+    def _file_source(self):
+        path = getattr(settings, 'BAD_WORDS_FILE', None)
+        if not path:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, source=None):
+        """Пересобирает автомат по текущему содержимому словаря."""
+        source = source or self._file_source()
+        words = list(self._words)
+        if source is not None:
+            with open(source[0], encoding='utf-8') as file:
+                words.extend(line.strip() for line in file)
+        self._matcher = WordMatcher(words)
+        self._source = source
+
+    def get_matcher(self):
+        source = self._file_source()
+        if source != self._source:
+            with self._lock:
+                if source != self._source:
+                    self.reload(source)
+        return self._matcher
+
+    def __call__(self, text):
+        return self.get_matcher().search(text)
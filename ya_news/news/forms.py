@@ -1,6 +1,7 @@
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
+from .censor import BadWordsFilter
 from .models import Comment
 
 BAD_WORDS = (
@@ -9,6 +10,8 @@ BAD_WORDS = (
 )
 WARNING = 'Не ругайтесь!'
 
+contains_bad_words = BadWordsFilter(BAD_WORDS)
+
 
 class CommentForm(ModelForm):
 
@@ -19,8 +22,6 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if contains_bad_words(text):
+            raise ValidationError(WARNING)
         return text
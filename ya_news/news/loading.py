@@ -0,0 +1,269 @@
+import json
+import os
+import time
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from .cache import invalidate_news_pages
+from .models import News, make_excerpt
+
+# Модели, которые принимает загрузчик, в порядке вставки внутри пачки:
+# комментарии ссылаются на новости.
+LOADED_MODELS = ('news.news', 'news.comment')
+BLOCK_SIZE = 1 << 16
+# Одна запись дампа не может быть больше: иначе битый файл
+# целиком оказался бы в памяти.
+MAX_RECORD_SIZE = 1 << 24
+SEPARATORS = frozenset(' \t\r\n,[]')
+
+
+class InvalidDump(ValueError):
+    pass
+
+
+def iter_records(file, offset=0, block_size=BLOCK_SIZE):
+    """
+    Потоково читает объекты из JSON-массива (как у dumpdata) или NDJSON.
+
+    Вместе с объектом отдаёт смещение в байтах сразу после него:
+    с этого места чтение можно продолжить после прерывания.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+    while True:
+        start = position
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        offset += position - start
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            block = file.read(block_size)
+            if not block:
+                if position < len(buffer):
+                    raise InvalidDump(f'Ошибка разбора JSON, байт {offset}.')
+                return
+            buffer = buffer[position:] + block
+            position = 0
+            if len(buffer) > MAX_RECORD_SIZE:
+                raise InvalidDump(f'Слишком большая запись, байт {offset}.')
+            continue
+        if not isinstance(record, dict):
+            raise InvalidDump(f'Ожидался объект, байт {offset}.')
+        offset += len(buffer[position:end].encode('utf-8'))
+        position = end
+        yield record, offset
+
+
+class Checkpoint:
+    """
+    Файл с позицией последней сохранённой пачки.
+
+    Записывается после фиксации каждой транзакции, поэтому после
+    прерывания загрузка продолжается со следующей записи дампа.
+    """
+
+    def __init__(self, path, dump_size):
+        self.path = path
+        self.dump_size = dump_size
+
+    def read(self):
+        """Смещение и число загруженных записей или (0, 0)."""
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0, 0
+        if state.get('size') != self.dump_size:
+            raise InvalidDump(
+                f'Контрольная точка {self.path} относится к другому файлу.'
+            )
+        return state['offset'], state['loaded']
+
+    def write(self, offset, loaded):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'offset': offset, 'loaded': loaded, 'size': self.dump_size},
+                file,
+            )
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def timestamp_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+
+
+def insert_as_is(model, objects):
+    """
+    Вставляет объекты пачками со значениями полей как есть.
+
+    bulk_create вызывает pre_save полей и заменяет время у полей
+    auto_now и auto_now_add текущим. Вставка в режиме raw, как
+    у loaddata (save_base(raw=True)), берёт значения с объектов,
+    поэтому время из дампа сохраняется.
+    """
+    using = router.db_for_write(model)
+    manager = model._base_manager.db_manager(using)
+    fields = model._meta.concrete_fields
+    groups = (
+        ([obj for obj in objects if obj.pk is not None], fields),
+        (
+            [obj for obj in objects if obj.pk is None],
+            [field for field in fields if not field.primary_key],
+        ),
+    )
+    for group, group_fields in groups:
+        if not group:
+            continue
+        size = connections[using].ops.bulk_batch_size(group_fields, group)
+        for start in range(0, len(group), size):
+            manager._insert(
+                group[start:start + size], fields=group_fields, raw=True
+            )
+
+
+class DumpLoader:
+    """
+    Загрузка новостей и комментариев пачками, см. insert_as_is.
+
+    Формат записей — как у dumpdata: model, pk и fields, внешний ключ
+    задаётся id, так что у новостей с комментариями нужен pk. Каждая
+    пачка сохраняется в своей транзакции. Сигналы при такой вставке не
+    отправляются, поэтому счётчики комментариев пересчитываются
+    и кеш страниц сбрасывается один раз в конце загрузки.
+    """
+
+    def __init__(self, batch_size, checkpoint=None, on_batch=None):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.on_batch = on_batch
+        self.models = {
+            label: apps.get_model(label) for label in LOADED_MODELS
+        }
+        self.fields = {
+            label: {
+                field.name: field for field in model._meta.concrete_fields
+            }
+            for label, model in self.models.items()
+        }
+        self.timestamp_fields = {
+            label: timestamp_fields(model)
+            for label, model in self.models.items()
+        }
+        self.commented_news = set()
+
+    def build(self, record):
+        label = str(record.get('model', '')).lower()
+        if label not in self.models:
+            raise InvalidDump(f'Неизвестная модель: {label or "не указана"}.')
+        model, fields = self.models[label], self.fields[label]
+        values = {}
+        for name, value in record.get('fields', {}).items():
+            field = fields.get(name)
+            if field is None:
+                raise InvalidDump(f'У модели {label} нет поля {name}.')
+            if field.is_relation:
+                values[field.attname] = field.target_field.to_python(value)
+                continue
+            value = field.to_python(value)
+            if (
+                isinstance(field, models.DateTimeField)
+                and value is not None
+                and timezone.is_naive(value)
+            ):
+                value = timezone.make_aware(value)
+            values[name] = value
+        # Время, которого нет в дампе, задаётся явно: insert_as_is
+        # не заполняет поля auto_now и auto_now_add.
+        for field in self.timestamp_fields[label]:
+            values.setdefault(field.name, timezone.now())
+        if record.get('pk') is not None:
+            values[model._meta.pk.attname] = model._meta.pk.to_python(
+                record['pk']
+            )
+        if model is News:
+            # Вставка пачками не вызывает save(), где вычисляется анонс.
+            values['excerpt'] = make_excerpt(values.get('text', ''))
+        return label, model(**values)
+
+    def save_batch(self, batch):
+        with transaction.atomic():
+            for label in LOADED_MODELS:
+                objects = batch[label]
+                if not objects:
+                    continue
+                insert_as_is(self.models[label], objects)
+        comments = batch['news.comment']
+        self.commented_news.update(comment.news_id for comment in comments)
+
+    def load(self, file, offset=0, loaded=0):
+        """Загружает дамп с указанного смещения, возвращает число записей."""
+        started = time.monotonic()
+        batch = {label: [] for label in LOADED_MODELS}
+        size = 0
+        for record, end in iter_records(file, offset):
+            label, instance = self.build(record)
+            batch[label].append(instance)
+            size += 1
+            if size < self.batch_size:
+                continue
+            loaded = self.flush(batch, size, end, loaded, started)
+            batch = {label: [] for label in LOADED_MODELS}
+            size = 0
+        if size:
+            loaded = self.flush(batch, size, end, loaded, started)
+        self.finish()
+        return loaded
+
+    def flush(self, batch, size, offset, loaded, started):
+        self.save_batch(batch)
+        loaded += size
+        if self.checkpoint is not None:
+            self.checkpoint.write(offset, loaded)
+        if self.on_batch is not None:
+            self.on_batch(loaded, time.monotonic() - started)
+        return loaded
+
+    def reset_sequences(self):
+        """
+        Сдвигает последовательности id за загруженные pk, как loaddata.
+
+        Записи дампа вставляются со своими id, и без сдвига PostgreSQL
+        выдал бы следующей новой записи уже занятый id. В SQLite
+        последовательностей нет, и запросов не будет.
+        """
+        using = router.db_for_write(News)
+        connection = connections[using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(self.models.values())
+        )
+        if not statements:
+            return
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def finish(self):
+        """
+        Пересчитывает счётчики у всех новостей, а не только у затронутых:
+        после возобновления загрузки прерванная часть уже не известна.
+        """
+        with transaction.atomic():
+            self.reset_sequences()
+            if self.commented_news:
+                News.objects.recount_comments()
+            invalidate_news_pages(*self.commented_news)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from news.benchmarks import (
+    free_port, generate_dataset, load_test, summarize, wait_for_port
+)
+from news.models import News
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+# Режим замера: интерфейс приложения и маршрут страницы новости.
+MODES = {
+    'wsgi': ('wsgi', 'news:detail'),
+    'asgi-sync': ('asgi3', 'news:detail'),
+    'asgi-async': ('asgi3', 'news:detail_async'),
+}
+
+
+def strip_header_values(application):
+    """
+    Django 3.2 отдаёт в WSGI значения Set-Cookie с пробелом в начале,
+    а uvicorn такие заголовки отвергает.
+    """
+
+    def wrapper(environ, start_response):
+        def strip_start_response(status, headers, exc_info=None):
+            return start_response(
+                status,
+                [(name, value.strip()) for name, value in headers],
+                exc_info,
+            )
+
+        return application(environ, strip_start_response)
+
+    return wrapper
+
+
+def serve(interface, port):
+    """Запускает проект под uvicorn; вызывается в отдельном процессе."""
+    if interface == 'wsgi':
+        from django.core.wsgi import get_wsgi_application
+        application = strip_header_values(get_wsgi_application())
+    else:
+        from django.core.asgi import get_asgi_application
+        application = get_asgi_application()
+    uvicorn.run(
+        application, host='127.0.0.1', port=port, interface=interface,
+        lifespan='off', log_level='warning',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвосты задержек страницы '
+        'новости под WSGI и ASGI, с синхронным и асинхронным '
+        'представлением. Сервер — uvicorn, БД — временный файл SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=200)
+        parser.add_argument('--comments-per-news', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=200)
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help='Сколько соединений отправляют запросы одновременно.',
+        )
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=list(MODES)
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть не меньше 1.')
+        if uvicorn is None:
+            raise CommandError('Для замера нужен uvicorn.')
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Серверу в другом процессе нужна БД в файле.
+                test_settings['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                with override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'localhost']
+                ):
+                    results = self.run_modes(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings['NAME'] = old_test_name
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode}: {result["rps"]:.0f} запросов/с, '
+                f'p50 {result["p50"]:.1f} мс, p95 {result["p95"]:.1f} мс, '
+                f'p99 {result["p99"]:.1f} мс, ошибок {result["errors"]}'
+            )
+
+    def run_modes(self, options):
+        author = generate_dataset(
+            options['news'], options['comments_per_news']
+        )
+        # Авторизованный клиент: анонимам страницы отдаются из кеша.
+        client = Client()
+        client.force_login(author)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        cookies = f'{cookie.key}={cookie.value}'
+        news_ids = list(News.objects.values_list('pk', flat=True)[:100])
+        # Соединения с БД нельзя наследовать в дочерних процессах.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = {}
+        for mode in options['modes']:
+            interface, name = MODES[mode]
+            paths = [reverse(name, args=(pk,)) for pk in news_ids]
+            port = free_port()
+            server = context.Process(
+                target=serve, args=(interface, port), daemon=True
+            )
+            server.start()
+            try:
+                wait_for_port(port)
+                asyncio.run(load_test(
+                    port, paths, options['warmup'], options['concurrency'],
+                    cookies,
+                ))
+                results[mode] = summarize(*asyncio.run(load_test(
+                    port, paths, options['requests'],
+                    options['concurrency'], cookies,
+                )))
+            finally:
+                server.terminate()
+                server.join()
+        return results
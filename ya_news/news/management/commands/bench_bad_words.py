@@ -0,0 +1,64 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from news.censor import WordMatcher
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def naive_search(words, text):
+    """Прежняя проверка: поиск подстроки для каждого слова по очереди."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость проверки комментария циклом по словам '
+        'и автоматом Ахо — Корасик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=20000)
+        parser.add_argument('--text-length', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = [
+            random_word(rng, rng.randint(6, 10))
+            for _ in range(options['words'])
+        ]
+        text = ' '.join(
+            random_word(rng, rng.randint(2, 8))
+            for _ in range(options['text_length'] // 5)
+        )[:options['text_length']]
+        build_started = timeit.default_timer()
+        matcher = WordMatcher(words)
+        build_time = timeit.default_timer() - build_started
+        assert matcher.search(text) == naive_search(words, text)
+        repeat = options['repeat']
+        naive_time = timeit.timeit(
+            lambda: naive_search(words, text), number=repeat
+        )
+        matcher_time = timeit.timeit(
+            lambda: matcher.search(text), number=repeat
+        )
+        self.stdout.write(
+            f'Слов: {len(words)}, длина текста: {len(text)}, '
+            f'повторов: {repeat}\n'
+            f'Сборка автомата: {build_time * 1000:.1f} мс\n'
+            f'Цикл по словам: {naive_time / repeat * 1e6:.1f} мкс/текст\n'
+            f'Автомат: {matcher_time / repeat * 1e6:.1f} мкс/текст\n'
+            f'Ускорение: {naive_time / matcher_time:.1f}x'
+        )
@@ -0,0 +1,154 @@
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.utils import load_backend
+
+from news.models import Comment, News
+
+# SQLite с настройками Django по умолчанию: журнал отката, BEGIN DEFERRED.
+DEFAULT_DATABASE = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'OPTIONS': {},
+}
+# Те же настройки, что у SQLITE_DATABASE в yanews/settings_prod.py:
+# WAL, ожидание блокировок и BEGIN IMMEDIATE.
+TUNED_DATABASE = {
+    'ENGINE': 'yanews.sqlite',
+    'OPTIONS': {
+        'timeout': 5,
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+        },
+    },
+}
+PROFILES = {
+    'default': DEFAULT_DATABASE,
+    'prod': TUNED_DATABASE,
+}
+
+
+def use_database(profile, path):
+    """Подменяет соединение default на БД с настройками профиля."""
+    settings_dict = {
+        'ATOMIC_REQUESTS': False,
+        'AUTOCOMMIT': True,
+        'CONN_MAX_AGE': 0,
+        'TIME_ZONE': None,
+        'USER': '',
+        'PASSWORD': '',
+        'HOST': '',
+        'PORT': '',
+        'TEST': {},
+        **PROFILES[profile],
+        'NAME': str(path),
+    }
+    backend = load_backend(settings_dict['ENGINE'])
+    connections['default'] = backend.DatabaseWrapper(settings_dict)
+
+
+def write_comments(profile, path, news_id, author_id, writes, start, results):
+    """
+    Отправка комментариев так же, как в представлениях: в транзакции
+    читается новость, создаётся комментарий и пересчитывается счётчик.
+    """
+    use_database(profile, path)
+    latencies, errors = [], 0
+    start.wait()
+    for number in range(writes):
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                news = News.objects.get(pk=news_id)
+                Comment.objects.create(
+                    news=news, author_id=author_id, text=f'Текст {number}'
+                )
+                News.objects.filter(pk=news_id).recount_comments()
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connections['default'].close()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает одновременную запись комментариев в SQLite с настройками '
+        'по умолчанию и с настройками settings_prod.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Сколько комментариев отправляет каждый процесс.',
+        )
+
+    def handle(self, *args, **options):
+        original = connections['default']
+        try:
+            for profile in PROFILES:
+                with tempfile.TemporaryDirectory() as directory:
+                    self.run_profile(
+                        profile, Path(directory) / 'bench.sqlite3',
+                        options['workers'], options['writes'],
+                    )
+        finally:
+            connections['default'] = original
+
+    def run_profile(self, profile, path, workers, writes):
+        use_database(profile, path)
+        call_command('migrate', verbosity=0)
+        author = get_user_model().objects.create(username='bench')
+        news = News.objects.create(title='Новость', text='Текст')
+        # Соединения с БД нельзя наследовать в дочерних процессах.
+        connections['default'].close()
+        context = multiprocessing.get_context('fork')
+        start = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=write_comments,
+                args=(
+                    profile, path, news.pk, author.pk, writes, start, results
+                ),
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        started = time.perf_counter()
+        start.set()
+        latencies, errors = [], 0
+        for _ in processes:
+            worker_latencies, worker_errors = results.get()
+            latencies += worker_latencies
+            errors += worker_errors
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        use_database(profile, path)
+        stored = Comment.objects.count()
+        connections['default'].close()
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            timing = (
+                f'p50 {cuts[49] * 1000:.1f} мс, p95 {cuts[94] * 1000:.1f} мс'
+            )
+        else:
+            timing = 'нет успешных записей'
+        self.stdout.write(
+            f'{profile}: записано {stored} из {workers * writes}, '
+            f'ошибок блокировки {errors}, '
+            f'{len(latencies) / elapsed:.0f} записей/с, {timing}'
+        )
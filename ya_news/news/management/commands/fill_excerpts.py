@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Заново вычисляет анонсы новостей для списков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = News.objects.fill_excerpts(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Анонсы обновлены у новостей: {updated}')
+        )
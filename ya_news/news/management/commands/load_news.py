@@ -0,0 +1,71 @@
+import io
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.loading import Checkpoint, DumpLoader, InvalidDump
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости и комментарии из JSON-массива '
+        'в формате dumpdata или из NDJSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с дампом.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько записей сохранять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с контрольной точки прерванной загрузки.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, по умолчанию <path>.checkpoint.',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        try:
+            dump_size = os.path.getsize(path)
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        checkpoint = Checkpoint(
+            options['checkpoint'] or f'{path}.checkpoint', dump_size
+        )
+        offset, loaded = 0, 0
+        try:
+            if options['resume']:
+                offset, loaded = checkpoint.read()
+            self.resumed_from = loaded
+            started = time.monotonic()
+            with open(path, 'rb') as raw:
+                raw.seek(offset)
+                # Без преобразования \r\n в \n: смещения в символах
+                # должны совпадать с байтами файла.
+                file = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                total = DumpLoader(
+                    options['batch_size'], checkpoint, self.report
+                ).load(file, offset, loaded)
+        except InvalidDump as error:
+            raise CommandError(error)
+        checkpoint.clear()
+        elapsed = time.monotonic() - started
+        rate = (total - loaded) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total - loaded} за {elapsed:.1f} с '
+            f'({rate:.0f} записей/с), всего в дампе: {total}'
+        ))
+
+    def report(self, loaded, elapsed):
+        if not self.verbosity:
+            return
+        rate = (loaded - self.resumed_from) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Загружено записей: {loaded} ({rate:.0f} записей/с)'
+        )
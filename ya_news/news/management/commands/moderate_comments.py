@@ -0,0 +1,50 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from news.moderation import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики очереди комментариев на модерации.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов-обработчиков.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько комментариев проверять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах, если очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать текущую очередь и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['batch_size'], options['interval'], options['once']
+        )
+        workers = options['workers']
+        if workers == 1:
+            run_worker(*worker_args)
+            return
+        # Соединения с БД нельзя наследовать в дочерних процессах.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=run_worker, args=(*worker_args, worker, workers)
+            )
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
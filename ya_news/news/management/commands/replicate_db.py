@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from news.replicas import replicate
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует SQLite-БД default во все реплики из NEWS_READ_REPLICAS. '
+        'Заменяет репликацию при локальной проверке чтения с реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между копированиями в секундах.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Скопировать один раз и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.NEWS_READ_REPLICAS
+        if not replicas:
+            raise CommandError('В NEWS_READ_REPLICAS нет реплик.')
+        for alias in (DEFAULT_DB_ALIAS, *replicas):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: поддерживается только SQLite.')
+        while True:
+            started = time.perf_counter()
+            for alias in replicas:
+                replicate(connections[DEFAULT_DB_ALIAS], connections[alias])
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
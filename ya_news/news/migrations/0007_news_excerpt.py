@@ -0,0 +1,53 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:15
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+EXCERPT_WORDS = 15
+EXCERPT_MAX_LENGTH = 300
+
+
+def make_excerpt(text):
+    """
+    Копия news.models.make_excerpt на момент миграции.
+
+    Миграция не импортирует код приложения: он может измениться,
+    а миграция должна заполнять анонсы так же, как при её создании.
+    """
+    truncator = Truncator(text)
+    excerpt = truncator.words(EXCERPT_WORDS)
+    if len(excerpt) <= EXCERPT_MAX_LENGTH:
+        return excerpt
+    head = excerpt[:EXCERPT_MAX_LENGTH - 1]
+    if not excerpt[len(head)].isspace() and len(head.split()) > 1:
+        head = head.rsplit(maxsplit=1)[0]
+    return truncator.add_truncation_text(head.rstrip())
+
+
+def fill_excerpt(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    news_list = []
+    for news in News.objects.only('pk', 'text').iterator(BATCH_SIZE):
+        news.excerpt = make_excerpt(news.text)
+        news_list.append(news)
+        if len(news_list) >= BATCH_SIZE:
+            News.objects.bulk_update(news_list, ('excerpt',))
+            news_list = []
+    News.objects.bulk_update(news_list, ('excerpt',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
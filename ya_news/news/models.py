@@ -2,23 +2,150 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import Truncator
+
+# Анонс новости в списках: первые слова текста.
+EXCERPT_WORDS = 15
+EXCERPT_MAX_LENGTH = 300
+
+
+def make_excerpt(text):
+    """
+    Первые EXCERPT_WORDS слов текста, как у фильтра truncatewords.
+
+    Если они длиннее EXCERPT_MAX_LENGTH, анонс обрезается по последнему
+    целому слову, которое помещается, и многоточие сохраняется. Слово
+    длиннее всего анонса обрезается по символам.
+    """
+    truncator = Truncator(text)
+    excerpt = truncator.words(EXCERPT_WORDS)
+    if len(excerpt) <= EXCERPT_MAX_LENGTH:
+        return excerpt
+    head = excerpt[:EXCERPT_MAX_LENGTH - 1]
+    if not excerpt[len(head)].isspace() and len(head.split()) > 1:
+        head = head.rsplit(maxsplit=1)[0]
+    return truncator.add_truncation_text(head.rstrip())
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def for_list(self):
+        """
+        Новости для списков: вместо полного текста читается анонс,
+        так что размер выборки не зависит от длины статей.
+        """
+        return self.defer('text')
+
+    def fill_excerpts(self, batch_size=1000):
+        """
+        Заново вычисляет анонсы, возвращает число изменённых новостей.
+
+        Нужна после изменения текста в обход save(), например
+        через update() или bulk_create без анонса. Записываются только
+        новости, у которых анонс изменился: у них обновляется время
+        изменения, чтобы сбросить кеш фрагментов списков и ETag.
+        """
+        fields = ('excerpt', 'updated')
+        news_list = []
+        count = 0
+        for news in self.only('pk', 'text', 'excerpt').iterator(
+            chunk_size=batch_size
+        ):
+            excerpt = make_excerpt(news.text)
+            if excerpt == news.excerpt:
+                continue
+            news.excerpt = excerpt
+            news.updated = timezone.now()
+            news_list.append(news)
+            if len(news_list) >= batch_size:
+                self.bulk_update(news_list, fields)
+                count += len(news_list)
+                news_list = []
+        self.bulk_update(news_list, fields)
+        return count + len(news_list)
+
+    def recount_comments(self):
+        """
+        Пересчитывает счётчик опубликованных комментариев.
+
+        Время изменения новостей обновляется: от него зависят ключи
+        кеша фрагментов со счётчиком.
+        """
+        comments = Comment.objects.filter(
+            news=OuterRef('pk'), status=Comment.Status.PUBLISHED
+        ).order_by().values('news').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.update(
+            comment_count=Coalesce(Subquery(comments), 0),
+            updated=timezone.now(),
+        )
+
+    def touch(self):
+        """Обновляет время изменения, не меняя остальных полей."""
+        return self.update(updated=timezone.now())
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    excerpt = models.CharField(
+        'Анонс',
+        max_length=EXCERPT_MAX_LENGTH,
+        blank=True,
+        editable=False,
+    )
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """Опубликованные комментарии и ожидающие модерации свои."""
+        published = Q(status=Comment.Status.PUBLISHED)
+        if not user.is_authenticated:
+            return self.filter(published)
+        return self.filter(
+            published | Q(status=Comment.Status.PENDING, author=user)
+        )
+
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'На модерации'
+        PUBLISHED = 'published', 'Опубликован'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -29,9 +156,28 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PUBLISHED,
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created'), name='comment_news_created_idx'
+            ),
+            models.Index(
+                fields=('author', 'id'), name='comment_author_id_idx'
+            ),
+            models.Index(
+                fields=('status', 'id'), name='comment_status_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
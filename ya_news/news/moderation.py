@@ -0,0 +1,85 @@
+import re
+import time
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.utils.module_loading import import_string
+
+from .cache import invalidate_news_pages
+from .forms import contains_bad_words
+from .models import Comment, News
+
+LINK_PATTERN = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+
+def check_bad_words(comment):
+    """Словарь мог обновиться с момента отправки комментария."""
+    return not contains_bad_words(comment.text)
+
+
+def check_links(comment):
+    """Не пропускаем комментарии, похожие на рассылку ссылок."""
+    links = len(LINK_PATTERN.findall(comment.text))
+    return links <= settings.COMMENT_MAX_LINKS
+
+
+def get_checks():
+    return [import_string(path) for path in settings.COMMENT_MODERATION_CHECKS]
+
+
+def moderate_batch(batch_size, checks=None, worker=0, workers=1):
+    """
+    Проверяет очередную пачку комментариев, ожидающих модерации.
+
+    Очередью служит сама таблица комментариев. Обработчики делят её
+    по остатку от деления id на их количество, поэтому не берут одни
+    и те же записи. Проверки выполняются вне транзакции, а в ней только
+    записываются решения: так блокировка записи в SQLite держится недолго.
+    Решение записывается, только если текст не менялся после проверки:
+    отредактированный комментарий остаётся в очереди на новую проверку.
+    Возвращает количество обработанных комментариев.
+    """
+    checks = get_checks() if checks is None else checks
+    pending = Comment.objects.filter(status=Comment.Status.PENDING)
+    if workers > 1:
+        pending = pending.annotate(
+            shard=Mod('id', workers)
+        ).filter(shard=worker)
+    batch = list(pending.order_by('id')[:batch_size])
+    if not batch:
+        return 0
+    verdicts = {Comment.Status.PUBLISHED: [], Comment.Status.REJECTED: []}
+    for comment in batch:
+        status = (
+            Comment.Status.PUBLISHED
+            if all(check(comment) for check in checks)
+            else Comment.Status.REJECTED
+        )
+        verdicts[status].append(Q(pk=comment.pk, text=comment.text))
+    news_ids = {comment.news_id for comment in batch}
+    with transaction.atomic():
+        for status, checked in verdicts.items():
+            if not checked:
+                continue
+            Comment.objects.filter(
+                reduce(or_, checked), status=Comment.Status.PENDING
+            ).update(status=status)
+        News.objects.filter(pk__in=news_ids).recount_comments()
+        invalidate_news_pages(*news_ids)
+    return len(batch)
+
+
+def run_worker(batch_size, interval, once=False, worker=0, workers=1):
+    """Цикл обработчика: модерирует пачки, пока не опустеет очередь."""
+    checks = get_checks()
+    while True:
+        close_old_connections()
+        if moderate_batch(batch_size, checks, worker, workers):
+            continue
+        if once:
+            return
+        time.sleep(interval)
@@ -0,0 +1,82 @@
+import json
+from dataclasses import dataclass
+from functools import reduce
+
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или не соответствует ключам пагинации."""
+
+
+@dataclass
+class KeysetPage:
+    """Страница выборки, полученная пагинацией по ключу."""
+    object_list: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа в непрозрачную строку для URL."""
+    raw = json.dumps([str(value) for value in values])
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(cursor, model, keys):
+    """Распаковывает курсор в значения полей модели."""
+    try:
+        raw_values = json.loads(urlsafe_base64_decode(cursor))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(raw_values, list) or len(raw_values) != len(keys):
+        raise InvalidCursor(cursor)
+    try:
+        return [
+            model._meta.get_field(key).to_python(value)
+            for key, value in zip(keys, raw_values)
+        ]
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def keyset_paginate(queryset, cursor, per_page, keys, descending=False):
+    """
+    Возвращает страницу, следующую за курсором.
+
+    Вместо OFFSET фильтруем по значениям ключа последней показанной записи,
+    поэтому стоимость запроса не зависит от номера страницы, если по ключам
+    есть составной индекс. Последний ключ должен быть уникальным.
+    """
+    lookup = 'lt' if descending else 'gt'
+    ordering = [f'-{key}' if descending else key for key in keys]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, keys)
+        conditions = []
+        for index, key in enumerate(keys):
+            equal = {
+                previous: values[position]
+                for position, previous in enumerate(keys[:index])
+            }
+            conditions.append(
+                Q(**equal, **{f'{key}__{lookup}': values[index]})
+            )
+        queryset = queryset.filter(reduce(lambda a, b: a | b, conditions))
+    objects = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(objects) > per_page:
+        objects = objects[:per_page]
+        last = objects[-1]
+        next_cursor = encode_cursor(getattr(last, key) for key in keys)
+    return KeysetPage(objects, next_cursor)
@@ -1,44 +1,197 @@
+import copy
+import re
+import time
+from contextlib import contextmanager
 from datetime import timedelta
 
 import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
+from news.cache import get_cache
 from news.models import Comment, News
 from yanews.settings import NEWS_COUNT_ON_HOME_PAGE
 
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+# Во сколько раз большой набор данных больше малого.
+DATASET_SCALES = (1, 100)
+
+
+class Snapshot:
+    """
+    Строки моделей, сохранённые один раз за прогон в отдельной базе SQLite.
+
+    База подключается к тестовому соединению через ATTACH, поэтому
+    строки возвращаются в таблицы одним INSERT ... SELECT на модель,
+    без создания объектов ORM. Значения колонок, например внешних
+    ключей на объекты конкретного теста, можно подменить при возврате.
+    """
+    schema = 'snapshot'
+
+    def __init__(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ATTACH DATABASE ':memory:' AS {self.schema}")
+
+    @staticmethod
+    def columns(model):
+        return [
+            field.column for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+
+    def save(self, name, queryset):
+        columns = self.columns(queryset.model)
+        sql, params = queryset.values_list(*columns).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {self.schema}.{name} AS {sql}', params
+            )
+
+    def restore(self, name, model, **values):
+        """Возвращает строки в таблицу модели; результат — id последней."""
+        columns = self.columns(model)
+        selected = [
+            '%s' if column in values else connection.ops.quote_name(column)
+            for column in columns
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {model._meta.db_table} ({", ".join(columns)}) '
+                f'SELECT {", ".join(selected)} FROM {self.schema}.{name}',
+                [values[column] for column in columns if column in values],
+            )
+            return cursor.lastrowid
+
+
+def logged_in_client(session_key):
+    """Клиент с готовой сессией: без force_login и записи в БД."""
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+    return client
+
+
+@pytest.fixture(scope='session')
+def shared_users(django_db_setup, django_db_blocker):
+    """
+    Пользователи и их сессии создаются один раз за прогон.
+
+    Они фиксируются в тестовой БД до первого теста; каждый тест
+    выполняется в транзакции и откатывается к этому состоянию.
+    """
+    users = {}
+    with django_db_blocker.unblock():
+        for key, username in (('author', 'Автор'), ('not_author', 'Не автор')):
+            user = get_user_model().objects.create(username=username)
+            client = Client()
+            client.force_login(user)
+            session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+            users[key] = (user, session_key)
+    return users
+
+
+@pytest.fixture(scope='session')
+def snapshot(django_db_setup, django_db_blocker):
+    """База для строк, сохранённых один раз за прогон, см. Snapshot."""
+    with django_db_blocker.unblock():
+        return Snapshot()
+
+
+@pytest.fixture(scope='session')
+def fixture_snapshot(snapshot, shared_users, django_db_blocker):
+    """Строки для фикстур news, comments_list и news_list."""
+    author, _ = shared_users['author']
+    with django_db_blocker.unblock():
+        news = News.objects.create(title='Заголовок', text='Текст заметки')
+        snapshot.save('news', News.objects.filter(pk=news.pk))
+        now = timezone.now()
+        for index in range(5):
+            comment = Comment.objects.create(
+                news=news,
+                author=author,
+                text=f'Teкст комментария {index}.',
+            )
+            comment.created = now + timedelta(days=index)
+            comment.save()
+        snapshot.save('comments_list', Comment.objects.all())
+        News.objects.all().delete()
+        today = timezone.now()
+        News.objects.bulk_create(
+            News(
+                title=f'Новость {index}.',
+                text='Текст новости.',
+                date=today - timedelta(days=index)
+            )
+            for index in range(NEWS_COUNT_ON_HOME_PAGE + 1)
+        )
+        snapshot.save('news_list', News.objects.all())
+        News.objects.all().delete()
+    return snapshot
+
+
+@pytest.fixture(scope='session')
+def dataset_snapshot(snapshot, shared_users, django_db_blocker):
+    """Новости и комментарии малого и большого объёма, собранные заранее."""
+    author, _ = shared_users['author']
+    with django_db_blocker.unblock():
+        for scale in DATASET_SCALES:
+            news = News.objects.create(title='Заголовок', text='Текст.')
+            News.objects.bulk_create(
+                News(title=f'Новость {index}', text='Текст новости.')
+                for index in range(10 * scale)
+            )
+            Comment.objects.bulk_create(
+                Comment(news=news, author=author, text=f'Комментарий {index}')
+                for index in range(5 * scale)
+            )
+            snapshot.save(f'news_{scale}', News.objects.exclude(pk=news.pk))
+            snapshot.save(f'comments_{scale}', Comment.objects.all())
+            News.objects.all().delete()
+    return snapshot
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """Кешированные страницы не должны переживать отдельный тест."""
+    get_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def sync_in_test_thread(settings):
+    """
+    Асинхронные представления выполняют ORM в потоке теста: данные
+    теста не зафиксированы, и из других соединений их не видно.
+    """
+    settings.NEWS_ASYNC_THREADS = 0
+
 
 @pytest.fixture
-def author(django_user_model):
-    return django_user_model.objects.create(username='Автор')
+def author(db, shared_users):
+    return copy.deepcopy(shared_users['author'][0])
 
 
 @pytest.fixture
-def not_author(django_user_model):
-    return django_user_model.objects.create(username='Не автор')
+def not_author(db, shared_users):
+    return copy.deepcopy(shared_users['not_author'][0])
 
 
 @pytest.fixture
-def author_client(author):
-    client = Client()
-    client.force_login(author)
-    return client
+def author_client(author, shared_users):
+    return logged_in_client(shared_users['author'][1])
 
 
 @pytest.fixture
-def not_author_client(not_author):
-    client = Client()
-    client.force_login(not_author)
-    return client
+def not_author_client(not_author, shared_users):
+    return logged_in_client(shared_users['not_author'][1])
 
 
 @pytest.fixture
-def news():
-    news = News.objects.create(
-        title='Заголовок',
-        text='Текст заметки',
-    )
-    return news
+def news(db, fixture_snapshot):
+    return News.objects.get(pk=fixture_snapshot.restore('news', News))
 
 
 @pytest.fixture
@@ -69,27 +222,92 @@ def form_data():
 
 
 @pytest.fixture
-def news_list():
-    today = timezone.now()
-    all_news = [
-        News(
-            title=f'Новость {index}.',
-            text='Текст новости.',
-            date=today - timedelta(days=index)
-        )
-        for index in range(NEWS_COUNT_ON_HOME_PAGE + 1)
-    ]
-    News.objects.bulk_create(all_news)
+def news_list(db, fixture_snapshot):
+    fixture_snapshot.restore('news_list', News)
 
 
 @pytest.fixture
-def comments_list(news, author):
-    now = timezone.now()
-    for index in range(5):
-        comment = Comment.objects.create(
-            news=news,
-            author=author,
-            text=f'Teкст комментария {index}.',
+def comments_list(news, author, fixture_snapshot):
+    fixture_snapshot.restore(
+        'comments_list', Comment, news_id=news.pk, author_id=author.pk
+    )
+
+
+@pytest.fixture(params=DATASET_SCALES, ids=('small', 'large'))
+def dataset(request, news, author, comment, dataset_snapshot):
+    """Новости и комментарии в малом и в стократно большем объёме."""
+    scale = request.param
+    dataset_snapshot.restore(f'news_{scale}', News)
+    dataset_snapshot.restore(
+        f'comments_{scale}', Comment, news_id=news.pk, author_id=author.pk
+    )
+
+
+def explain_query_plan(sql):
+    """План выполнения запроса в SQLite: список строк detail."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@pytest.fixture
+def assert_no_full_scans():
+    """
+    Контекстный менеджер, проверяющий планы SELECT-запросов внутри блока.
+
+    Падает, если SQLite собирается читать какую-либо таблицу целиком,
+    а не через индекс, или сортировать выборку без индекса.
+    Таблицы из allowed_tables пропускаются.
+    """
+    if connection.vendor != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN поддерживается только в SQLite.')
+
+    @contextmanager
+    def check(allowed_tables=()):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        full_scans = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for detail in explain_query_plan(sql):
+                match = FULL_SCAN.match(detail)
+                if (
+                    match and match['table'] not in allowed_tables
+                    or detail == TEMP_SORT
+                ):
+                    full_scans.append(f'{detail}: {sql}')
+        assert not full_scans, 'Полный просмотр таблиц:\n' + '\n'.join(
+            full_scans
         )
-        comment.created = now + timedelta(days=index)
-        comment.save()
+
+    return check
+
+
+@pytest.fixture
+def measure_request(record_property):
+    """
+    Выполняет запрос клиентом и замеряет его.
+
+    Возвращает ответ, список выполненных SQL-запросов и длительность
+    в секундах. Потоковый ответ читается целиком, так что его запросы
+    тоже попадают в замер. Количество запросов и длительность также
+    попадают в свойства теста в отчёте JUnit XML.
+    """
+
+    def measure(client, url, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                # Потоковый ответ читает БД, пока отдаётся клиенту.
+                response.streaming_content = list(
+                    response.streaming_content
+                )
+            duration = time.perf_counter() - started
+        record_property(f'{url} queries', len(context))
+        record_property(f'{url} duration', f'{duration:.6f}')
+        return response, context.captured_queries, duration
+
+    return measure
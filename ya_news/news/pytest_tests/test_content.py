@@ -1,8 +1,14 @@
+from http import HTTPStatus
+
 import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.urls import reverse
 from pytest_lazyfixture import lazy_fixture
 
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.moderation import moderate_batch
 from yanews.settings import NEWS_COUNT_ON_HOME_PAGE
 
 
@@ -27,6 +33,165 @@ def test_news_order(client):
     assert all_dates == sorted_dates
 
 
+@pytest.mark.django_db
+def test_home_page_uses_comment_counter(
+    client, news, comments_list, django_assert_num_queries
+):
+    """Главная страница строится одним запросом, без загрузки комментариев."""
+    News.objects.recount_comments()
+    url = reverse('news:home')
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert 'Комментариев: 5' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_archive_pages_cover_all_news(client, news_list):
+    """Архив по курсору отдаёт все новости по порядку и без повторов."""
+    url = reverse('news:archive')
+    seen = []
+    cursor = ''
+    while True:
+        response = client.get(url, {'cursor': cursor} if cursor else None)
+        page = response.context['page']
+        assert len(page) <= settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        seen.extend(page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    expected = list(News.objects.order_by('-date', '-id'))
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_archive_rejects_broken_cursor(client):
+    """Повреждённый курсор архива приводит к ошибке 404."""
+    response = client.get(reverse('news:archive'), {'cursor': 'мусор'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'name',
+    ('news:home', 'news:detail', 'news:home_async', 'news:detail_async'),
+)
+def test_anonymous_pages_are_cached(
+    client, news, name, django_assert_num_queries
+):
+    """Повторный запрос анонима обслуживается из кеша без запросов к БД."""
+    args = (news.id,) if name.startswith('news:detail') else None
+    url = reverse(name, args=args)
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_new_comment_evicts_cached_pages(
+    client, author_client, news, form_data,
+    django_capture_on_commit_callbacks,
+):
+    """Новый комментарий сбрасывает кеш своей новости и главной."""
+    detail_url = reverse('news:detail', args=(news.id,))
+    home_url = reverse('news:home')
+    client.get(detail_url)
+    client.get(home_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(detail_url, data=form_data)
+        moderate_batch(batch_size=10)
+    assert form_data['text'] in client.get(detail_url).content.decode()
+    assert 'Комментариев: 1' in client.get(home_url).content.decode()
+
+
+def test_async_detail_matches_sync(author_client, author, news):
+    """
+    Асинхронная страница новости показывает то же, что синхронная,
+    включая свои комментарии на модерации.
+    """
+    Comment.objects.create(
+        news=news, author=author, text='Текст',
+        status=Comment.Status.PENDING,
+    )
+    sync_response, async_response = (
+        author_client.get(reverse(name, args=(news.id,)))
+        for name in ('news:detail', 'news:detail_async')
+    )
+    assert async_response.context['news'] == sync_response.context['news']
+    assert (
+        list(async_response.context['comments'])
+        == list(sync_response.context['comments'])
+    )
+    assert isinstance(async_response.context['form'], CommentForm)
+
+
+def test_async_views_in_thread_pool(client, settings, django_db_blocker):
+    """
+    Асинхронные страницы читают данные в потоках пула, как в рабочем
+    режиме: со своими соединениями, которым видны только
+    зафиксированные данные. Поэтому данные теста фиксируются
+    и удаляются в конце, а не откатываются.
+    """
+    settings.NEWS_ASYNC_THREADS = 2
+    with django_db_blocker.unblock():
+        user = get_user_model().objects.create(username='Читатель')
+        news = News.objects.create(title='Заголовок', text='Текст')
+        try:
+            comment = Comment.objects.create(
+                news=news, author=user, text='Текст'
+            )
+            home = client.get(reverse('news:home_async'))
+            detail = client.get(
+                reverse('news:detail_async', args=(news.pk,))
+            )
+            assert list(home.context['object_list']) == [news]
+            assert detail.context['news'] == news
+            assert list(detail.context['comments']) == [comment]
+        finally:
+            news.delete()
+            user.delete()
+
+
+@pytest.mark.django_db
+def test_async_detail_of_missing_news(client):
+    """Для несуществующей новости асинхронная страница отвечает 404."""
+    response = client.get(reverse('news:detail_async', args=(1,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_unchanged_detail_not_modified(
+    author_client, author, news, comments_list, django_assert_max_num_queries
+):
+    """
+    Неизменившаяся страница новости отдаётся как 304 без загрузки
+    комментариев и отрисовки шаблона, а новый комментарий меняет ETag.
+    """
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.get(url)
+    etag = response['ETag']
+    # Время с точностью до секунды не отдаётся, см. ConditionalGetMixin.
+    assert not response.has_header('Last-Modified')
+    # Сессия, пользователь и сама новость.
+    with django_assert_max_num_queries(3):
+        response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.templates == []
+    Comment.objects.create(news=news, author=author, text='Текст')
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_cached_detail_not_modified(client, news, django_assert_num_queries):
+    """Анониму, у которого страница не устарела, кеш отвечает 304."""
+    url = reverse('news:detail', args=(news.id,))
+    response = client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
 @pytest.mark.django_db
 def test_comments_order(client, news, comments_list):
     """Комментарии отсортированы в хронологическом порядке."""
@@ -39,6 +204,37 @@ def test_comments_order(client, news, comments_list):
     assert all_timestamps == sorted_timestamps
 
 
+@pytest.mark.django_db
+def test_comments_are_paginated(client, news, comments_list, settings):
+    """Комментарии выводятся страницами, следующие подгружаются отдельно."""
+    settings.COMMENTS_COUNT_ON_PAGE = 2
+    expected = list(Comment.objects.order_by('created', 'id'))
+    response = client.get(reverse('news:detail', args=(news.id,)))
+    page = response.context['comments']
+    seen = list(page)
+    url = reverse('news:comments', args=(news.id,))
+    while page.has_next:
+        response = client.get(url, {'cursor': page.next_cursor})
+        page = response.context['comments']
+        assert len(page) <= settings.COMMENTS_COUNT_ON_PAGE
+        seen.extend(page)
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_comments_fragment_as_json(client, news, comments_list, settings):
+    """Страница комментариев доступна в формате JSON."""
+    settings.COMMENTS_COUNT_ON_PAGE = 3
+    url = reverse('news:comments', args=(news.id,))
+    data = client.get(url, {'format': 'json'}).json()
+    assert len(data['comments']) == 3
+    data = client.get(
+        url, {'format': 'json', 'cursor': data['next_cursor']}
+    ).json()
+    assert len(data['comments']) == 2
+    assert data['next_cursor'] is None
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'parametrized_client, availability_form',
@@ -1,11 +1,30 @@
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timezone
 from http import HTTPStatus
+from pathlib import Path
 
 import pytest
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connections, router
+from django.db.utils import load_backend
+from django.http import HttpResponse
 from django.urls import reverse
 from pytest_django.asserts import assertFormError, assertRedirects
 
-from news.models import Comment
+from news.censor import WordMatcher
+from news.models import (
+    EXCERPT_MAX_LENGTH, EXCERPT_WORDS, Comment, News, make_excerpt
+)
 from news.forms import BAD_WORDS, WARNING
+from news.loading import DumpLoader
+from news.moderation import moderate_batch
+from news.replicas import ReplicaPinningMiddleware, replicate
+from yanews.metrics import UNRESOLVED, RequestMetricsMiddleware, registry
+
+FIXTURE_PATH = Path(__file__).parents[1] / 'fixtures' / 'news.json'
 
 
 @pytest.mark.django_db
@@ -35,6 +54,54 @@ def test_user_can_create_comment(
     assert comment.text == form_data['text']
     assert comment.author == author
     assert comment.news == news
+    assert comment.status == Comment.Status.PENDING
+
+
+def test_moderation_publishes_pending_comments(
+    author_client, news_id_for_args, form_data, news
+):
+    """Фоновая модерация публикует комментарий и обновляет счётчик."""
+    url = reverse('news:detail', args=news_id_for_args)
+    author_client.post(url, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 0
+    assert moderate_batch(batch_size=10) == 1
+    assert Comment.objects.get().status == Comment.Status.PUBLISHED
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert moderate_batch(batch_size=10) == 0
+
+
+def test_moderation_skips_edited_comment(comment):
+    """Правка во время проверки не публикуется со старым решением."""
+    Comment.objects.filter(pk=comment.pk).update(
+        status=Comment.Status.PENDING
+    )
+
+    def edit_during_check(checked):
+        Comment.objects.filter(pk=checked.pk).update(text='Новый текст')
+        return True
+
+    assert moderate_batch(batch_size=10, checks=[edit_during_check]) == 1
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PENDING
+    assert comment.text == 'Новый текст'
+
+
+def test_moderation_rejects_link_spam(
+    author_client, news_id_for_args, news, settings
+):
+    """Комментарий со слишком большим числом ссылок отклоняется."""
+    url = reverse('news:detail', args=news_id_for_args)
+    links = ' '.join(
+        f'https://example.com/{index}'
+        for index in range(settings.COMMENT_MAX_LINKS + 1)
+    )
+    author_client.post(url, data={'text': links})
+    moderate_batch(batch_size=10)
+    assert Comment.objects.get().status == Comment.Status.REJECTED
+    news.refresh_from_db()
+    assert news.comment_count == 0
 
 
 @pytest.mark.parametrize(
@@ -58,6 +125,78 @@ def test_user_cant_use_bad_words(
     assert comments_count == 0
 
 
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+        ('ушёл в подшефы', True),
+        ('Шерстяной носок', True),
+        ('хершел', True),
+        ('шелест', False),
+        ('', False),
+    )
+)
+def test_word_matcher(text, expected):
+    """Автомат находит слова в любом месте текста без учёта регистра."""
+    matcher = WordMatcher(('шеф', 'херш', 'шерсть', 'ерст'))
+    assert matcher.search(text) is expected
+
+
+def test_bad_words_reloaded_from_file(
+    not_author_client, news_id_for_args, settings, tmp_path
+):
+    """Словарь запрещённых слов подхватывается из файла без перезапуска."""
+    url = reverse('news:detail', args=news_id_for_args)
+    bad_words_file = tmp_path / 'bad_words.txt'
+    bad_words_file.write_text('брокколи\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(bad_words_file)
+    response = not_author_client.post(url, data={'text': 'Ем брокколи'})
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    settings.BAD_WORDS_FILE = None
+    response = not_author_client.post(url, data={'text': 'Ем брокколи'})
+    assertRedirects(response, f'{url}#comments')
+
+
+def test_home_fragment_follows_news_changes(author_client, author, news):
+    """
+    Фрагмент новости на главной берётся из кеша, пока новость
+    и её комментарии не меняются.
+    """
+    url = reverse('news:home')
+    author_client.get(url)
+    News.objects.filter(pk=news.pk).update(title='Новый заголовок')
+    assert 'Новый заголовок' not in author_client.get(url).content.decode()
+    Comment.objects.create(news=news, author=author, text='Текст')
+    assert 'Новый заголовок' in author_client.get(url).content.decode()
+
+
+def test_excerpt_follows_news_text(author_client, news):
+    """
+    Анонс вычисляется при сохранении новости, а после изменения
+    текста в обход save() — командой fill_excerpts.
+    """
+    news.text = ' '.join(f'слово{number}' for number in range(100))
+    news.save()
+    assert news.excerpt == ' '.join(
+        f'слово{number}' for number in range(15)
+    ) + '…'
+    News.objects.filter(pk=news.pk).update(text='Короткий текст')
+    call_command('fill_excerpts', verbosity=0)
+    news.refresh_from_db()
+    assert news.excerpt == 'Короткий текст'
+    # Новости с актуальным анонсом не перезаписываются.
+    assert News.objects.fill_excerpts() == 0
+    response = author_client.get(reverse('news:home'))
+    assert 'Короткий текст' in response.content.decode()
+
+
+def test_long_excerpt_cut_at_word():
+    """Слишком длинный анонс обрезается по целому слову с многоточием."""
+    word = 'слово' * 20
+    excerpt = make_excerpt(' '.join([word] * EXCERPT_WORDS))
+    assert len(excerpt) <= EXCERPT_MAX_LENGTH
+    assert excerpt.endswith(word + '…')
+
+
 def test_author_can_delete_comment(
     author_client, comment_id_for_args, news_id_for_args
 ):
@@ -69,6 +208,32 @@ def test_author_can_delete_comment(
     assertRedirects(response, url_to_comments)
     comments_count = Comment.objects.count()
     assert comments_count == 0
+    assert News.objects.get(pk=news_id_for_args[0]).comment_count == 0
+
+
+def test_deleted_comment_leaves_cached_page(
+    client, author_client, comment, news_id_for_args,
+    django_capture_on_commit_callbacks,
+):
+    """Удалённый комментарий сразу пропадает со страницы в кеше."""
+    url = reverse('news:detail', args=news_id_for_args)
+    assert comment.text in client.get(url).content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(reverse('news:delete', args=(comment.pk,)))
+    assert comment.text not in client.get(url).content.decode()
+
+
+def test_news_deleted_with_comments_in_few_queries(
+    db, news, author, django_assert_max_num_queries
+):
+    """Комментарии удаляемой новости удаляются одним запросом."""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(200)
+    )
+    with django_assert_max_num_queries(4):
+        news.delete()
+    assert not Comment.objects.exists()
 
 
 def test_author_can_edit_comment(
@@ -115,3 +280,297 @@ def test_user_cant_edit_comment_of_another_user(
     assert comment.text == comment_text
     assert comment.author == author
     assert comment.news == news
+
+
+def make_dump(author, news_count=3, comments_per_news=2):
+    records = [
+        {
+            'model': 'news.news',
+            'pk': pk,
+            'fields': {'title': f'Новость {pk}', 'text': 'Текст.',
+                       'date': '2022-11-01'},
+        }
+        for pk in range(1, news_count + 1)
+    ]
+    records += [
+        {
+            'model': 'news.comment',
+            'fields': {'news': pk, 'author': author.pk, 'text': 'Текст.',
+                       'created': '2022-11-02T10:00:00Z'},
+        }
+        for pk in range(1, news_count + 1)
+        for _ in range(comments_per_news)
+    ]
+    return records
+
+
+@pytest.mark.django_db
+def test_loaddata_fixture():
+    """Фикстура с новостями загружается штатной командой loaddata."""
+    call_command('loaddata', 'news', verbosity=0)
+    fixture = json.loads(FIXTURE_PATH.read_text(encoding='utf-8'))
+    assert News.objects.count() == len(fixture)
+    assert not News.objects.filter(updated=None).exists()
+    assert not News.objects.filter(excerpt='').exists()
+
+
+@pytest.mark.django_db
+def test_load_news_reads_dumpdata_fixture():
+    """Загрузчик читает JSON-массив в формате dumpdata."""
+    call_command('load_news', str(FIXTURE_PATH), verbosity=0)
+    fixture = json.loads(FIXTURE_PATH.read_text(encoding='utf-8'))
+    assert News.objects.count() == len(fixture)
+
+
+def test_load_news_keeps_dumped_values(author, tmp_path):
+    """Время комментариев берётся из дампа, счётчики пересчитываются."""
+    dump = tmp_path / 'dump.ndjson'
+    dump.write_text(
+        '\n'.join(json.dumps(record) for record in make_dump(author)),
+        encoding='utf-8',
+    )
+    call_command('load_news', str(dump), batch_size=4, verbosity=0)
+    assert Comment.objects.count() == 6
+    assert set(Comment.objects.values_list('created', flat=True)) == {
+        datetime(2022, 11, 2, 10, tzinfo=timezone.utc)
+    }
+    assert set(News.objects.values_list('comment_count', flat=True)) == {2}
+    assert all(News.objects.values_list('excerpt', flat=True))
+    assert not Path(f'{dump}.checkpoint').exists()
+
+
+@pytest.mark.parametrize('newline', ('\n', '\r\n'))
+def test_load_news_resumes_after_failure(
+    author, tmp_path, monkeypatch, newline
+):
+    """После прерывания загрузка продолжается без повторов."""
+    dump = tmp_path / 'dump.json'
+    dump.write_bytes(
+        json.dumps(make_dump(author), ensure_ascii=False, indent=2)
+        .replace('\n', newline).encode('utf-8')
+    )
+    save_batch = DumpLoader.save_batch
+    batches = []
+
+    def fail_on_second_batch(loader, batch):
+        batches.append(batch)
+        if len(batches) == 2:
+            raise RuntimeError('Загрузка прервана.')
+        save_batch(loader, batch)
+
+    monkeypatch.setattr(DumpLoader, 'save_batch', fail_on_second_batch)
+    with pytest.raises(RuntimeError):
+        call_command('load_news', str(dump), batch_size=4, verbosity=0)
+    assert Comment.objects.count() == 1
+    monkeypatch.setattr(DumpLoader, 'save_batch', save_batch)
+    call_command(
+        'load_news', str(dump), batch_size=4, resume=True, verbosity=0
+    )
+    assert News.objects.count() == 3
+    assert Comment.objects.count() == 6
+
+
+def test_load_news_resets_sequences(author, tmp_path, monkeypatch):
+    """После загрузки последовательности id сдвигаются, как у loaddata."""
+    dump = tmp_path / 'dump.json'
+    dump.write_text(json.dumps(make_dump(author)), encoding='utf-8')
+    reset = []
+
+    def sequence_reset_sql(style, model_list):
+        reset.extend(model_list)
+        return ['SELECT 1']
+
+    monkeypatch.setattr(
+        connections['default'].ops, 'sequence_reset_sql', sequence_reset_sql
+    )
+    call_command('load_news', str(dump), verbosity=0)
+    assert reset == [News, Comment]
+
+
+def test_prod_sqlite_backend_tunes_connection(tmp_path, django_db_blocker):
+    """
+    Настроенный бэкенд SQLite включает WAL и ожидание блокировок.
+
+    Транзакция сразу берёт блокировку записи: вторая транзакция
+    на запись не может начаться, пока первая не завершена.
+    """
+    path = tmp_path / 'db.sqlite3'
+    settings_dict = {
+        'ENGINE': 'yanews.sqlite',
+        'NAME': str(path),
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+            },
+        },
+        'AUTOCOMMIT': True,
+        'TIME_ZONE': None,
+    }
+    connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(
+        settings_dict
+    )
+    with django_db_blocker.unblock():
+        with connection.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+        connection._start_transaction_under_autocommit()
+        other = sqlite3.connect(path, timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            other.execute('BEGIN IMMEDIATE')
+        other.close()
+        connection.close()
+    assert pragmas == {
+        'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000
+    }
+
+
+@pytest.mark.parametrize(
+    'method, cookies, expected',
+    (
+        ('get', {}, 'replica'),
+        ('post', {}, 'default'),
+        ('get', {ReplicaPinningMiddleware.cookie_name: '1'}, 'default'),
+    )
+)
+def test_reads_routed_to_replica(rf, settings, method, cookies, expected):
+    """
+    Безопасные запросы читают из реплики, а запросы с записью и запросы
+    сразу после записи — из default. Сессии всегда читаются из default.
+    """
+    settings.NEWS_READ_REPLICAS = ['replica']
+    aliases = {}
+
+    def view(request):
+        aliases['news'] = router.db_for_read(News)
+        aliases['session'] = router.db_for_read(Session)
+        return HttpResponse()
+
+    request = getattr(rf, method)('/')
+    request.COOKIES.update(cookies)
+    ReplicaPinningMiddleware(view)(request)
+    assert aliases == {'news': expected, 'session': 'default'}
+    assert router.db_for_read(News) == 'default'
+
+
+def test_replica_pinning_in_async_chain(rf, settings):
+    """
+    В асинхронной цепочке middleware реплика выбирается для представления
+    и сбрасывается после ответа.
+    """
+    settings.NEWS_READ_REPLICAS = ['replica']
+    aliases = []
+
+    async def view(request):
+        aliases.append(router.db_for_read(News))
+        return HttpResponse()
+
+    middleware = ReplicaPinningMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    async def handle():
+        await middleware(rf.get('/'))
+        return router.db_for_read(News)
+
+    assert asyncio.run(handle()) == 'default'
+    assert aliases == ['replica']
+
+
+def test_comment_pins_reads_to_default(
+    author_client, settings, news_id_for_args, form_data
+):
+    """После отправки комментария автор какое-то время читает из default."""
+    settings.NEWS_READ_REPLICAS = ['replica']
+    url = reverse('news:detail', args=news_id_for_args)
+    response = author_client.post(url, data=form_data)
+    cookie = response.cookies[ReplicaPinningMiddleware.cookie_name]
+    assert cookie['max-age'] == settings.NEWS_REPLICA_LAG_SECONDS
+
+
+@pytest.mark.parametrize(
+    'name',
+    ('news:home', 'news:detail', 'news:home_async', 'news:detail_async'),
+)
+def test_page_cache_filled_from_primary(
+    client, settings, django_db_blocker, name
+):
+    """
+    Страница для кеша анонимов читается из default: реплики 'replica'
+    в настройках БД нет, и чтение из неё завершилось бы ошибкой.
+    Внутри транзакции теста роутер и так читает из default, поэтому
+    данные фиксируются и удаляются в конце.
+    """
+    settings.NEWS_READ_REPLICAS = ['replica']
+    with django_db_blocker.unblock():
+        news = News.objects.create(title='Заголовок', text='Текст')
+        try:
+            args = (news.pk,) if 'detail' in name else None
+            response = client.get(reverse(name, args=args))
+            assert response.status_code == HTTPStatus.OK
+            assert news.title in response.content.decode()
+        finally:
+            news.delete()
+
+
+def test_replicate_copies_database(tmp_path, django_db_blocker):
+    """Репликатор переносит в реплику таблицы и данные основной БД."""
+    source, target = (
+        load_backend('django.db.backends.sqlite3').DatabaseWrapper({
+            'NAME': str(tmp_path / name),
+            'OPTIONS': {},
+            'CONN_MAX_AGE': 0,
+            'AUTOCOMMIT': True,
+            'TIME_ZONE': None,
+        })
+        for name in ('db.sqlite3', 'replica.sqlite3')
+    )
+    with django_db_blocker.unblock():
+        with source.cursor() as cursor:
+            cursor.execute('CREATE TABLE news (title TEXT)')
+            cursor.execute("INSERT INTO news VALUES ('Новость')")
+        replicate(source, target)
+        with target.cursor() as cursor:
+            rows = cursor.execute('SELECT title FROM news').fetchall()
+        source.close()
+        target.close()
+    assert rows == [('Новость',)]
+
+
+def test_request_metrics_by_route(admin_client, settings, news_id_for_args):
+    """Метрики собираются по имени маршрута и выгружаются текстом."""
+    settings.REQUEST_METRICS = True
+    registry.reset()
+    response = admin_client.get(reverse('news:detail', args=news_id_for_args))
+    detail = admin_client.get(reverse('metrics')).json()['news:detail']
+    text = admin_client.get(reverse('metrics'), {'format': 'text'})
+    registry.reset()
+    assert detail['duration_ms']['count'] == 1
+    assert detail['sql_count']['sum'] > 0
+    assert detail['render_ms']['sum'] > 0
+    assert detail['response_bytes']['sum'] == len(response.content)
+    assert (
+        'request_sql_count_count{route="news:detail"} 1'
+        in text.content.decode()
+    )
+
+
+@pytest.mark.django_db
+def test_request_metrics_report_duplicate_queries(rf, settings, news_list):
+    """Запросы, повторённые внутри одного запроса, попадают в отчёт."""
+    settings.REQUEST_METRICS = True
+    registry.reset()
+
+    def view(request):
+        for news in News.objects.all()[:3]:
+            Comment.objects.filter(news=news).exists()
+        return HttpResponse()
+
+    RequestMetricsMiddleware(view)(rf.get('/'))
+    duplicates = registry.snapshot()[UNRESOLVED]['duplicate_queries']
+    registry.reset()
+    assert list(duplicates.values()) == [{'requests': 1, 'max_repeats': 3}]
@@ -0,0 +1,128 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from pytest_lazyfixture import lazy_fixture
+
+from news import urls
+from news.benchmarks import (
+    generate_dataset, measure_url, named_urls, url_cases
+)
+from news.models import Comment, News
+from news.moderation import moderate_batch
+
+# Допустимое число SQL-запросов для авторизованного пользователя.
+# Два из них всегда уходят на чтение сессии и пользователя.
+QUERY_BUDGETS = {
+    'news:home': 3,
+    'news:archive': 3,
+    'news:detail': 4,
+    'news:comments': 4,
+    'news:edit': 4,
+    'news:delete': 4,
+    'news:home_async': 3,
+    'news:detail_async': 4,
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'parametrized_client, name, args',
+    (
+        (lazy_fixture('client'), 'news:home', None),
+        (lazy_fixture('client'), 'news:archive', None),
+        (
+            lazy_fixture('client'),
+            'news:detail',
+            lazy_fixture('news_id_for_args'),
+        ),
+        (
+            lazy_fixture('author_client'),
+            'news:detail',
+            lazy_fixture('news_id_for_args'),
+        ),
+        (
+            lazy_fixture('client'),
+            'news:comments',
+            lazy_fixture('news_id_for_args'),
+        ),
+        (
+            lazy_fixture('author_client'),
+            'news:edit',
+            lazy_fixture('comment_id_for_args'),
+        ),
+        (
+            lazy_fixture('author_client'),
+            'news:delete',
+            lazy_fixture('comment_id_for_args'),
+        ),
+    )
+)
+def test_views_use_indexes(
+    parametrized_client, name, args, news_list, comments_list, comment,
+    assert_no_full_scans,
+):
+    """Запросы страниц YaNews не читают таблицы целиком."""
+    url = reverse(name, args=args)
+    with assert_no_full_scans():
+        response = parametrized_client.get(url)
+    if name != 'news:archive':
+        return
+    cursor = response.context['page'].next_cursor
+    with assert_no_full_scans():
+        parametrized_client.get(url, {'cursor': cursor})
+
+
+@pytest.mark.django_db
+def test_moderation_queue_uses_index(comments_list, assert_no_full_scans):
+    """Выборка очереди модерации идёт по индексу статуса."""
+    with assert_no_full_scans():
+        moderate_batch(batch_size=10)
+
+
+def test_every_url_has_query_budget():
+    """Для каждого маршрута приложения объявлен бюджет запросов."""
+    names = {f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns}
+    assert names == set(QUERY_BUDGETS)
+
+
+@pytest.mark.django_db
+def test_benchmark_covers_every_url():
+    """Нагрузочный замер bench_urls проходит по всем маршрутам проекта."""
+    author = generate_dataset(news_count=3, comments_per_news=2, users=2)
+    assert News.objects.count() == 3
+    assert Comment.objects.count() == 6
+    names = {name for _, name, _, _ in url_cases(author)}
+    assert names == named_urls()
+
+
+@pytest.mark.django_db
+def test_benchmark_single_request(client):
+    """Замер из одного запроса даёт равные процентили, а не ошибку."""
+    result = measure_url(client, reverse('news:home'), requests=1, warmup=0)
+    assert result['p50'] == result['p99'] == result['mean']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('news:home', None),
+        ('news:archive', None),
+        ('news:detail', lazy_fixture('news_id_for_args')),
+        ('news:comments', lazy_fixture('news_id_for_args')),
+        ('news:edit', lazy_fixture('comment_id_for_args')),
+        ('news:delete', lazy_fixture('comment_id_for_args')),
+        ('news:home_async', None),
+        ('news:detail_async', lazy_fixture('news_id_for_args')),
+    )
+)
+def test_query_budget(name, args, author_client, dataset, measure_request):
+    """Число SQL-запросов страницы не зависит от объёма данных."""
+    response, queries, _ = measure_request(
+        author_client, reverse(name, args=args)
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) <= QUERY_BUDGETS[name], '\n'.join(
+        query['sql'] for query in queries
+    )
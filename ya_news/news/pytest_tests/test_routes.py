@@ -11,10 +11,14 @@ from pytest_lazyfixture import lazy_fixture
     'name, args',
     (
         ('news:home', None),
+        ('news:archive', None),
         ('users:login', None),
         ('users:logout', None),
         ('users:signup', None),
         ('news:detail', lazy_fixture('news_id_for_args')),
+        ('news:comments', lazy_fixture('news_id_for_args')),
+        ('news:home_async', None),
+        ('news:detail_async', lazy_fixture('news_id_for_args')),
     )
 )
 def test_pages_availability_for_anonymous_user(args, client, name):
@@ -75,3 +79,18 @@ def test_redirects(client, name, args):
     expected_url = f'{login_url}?next={url}'
     response = client.get(url)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'parametrized_client, expected_status',
+    (
+        (lazy_fixture('client'), HTTPStatus.FOUND),
+        (lazy_fixture('author_client'), HTTPStatus.FOUND),
+        (lazy_fixture('admin_client'), HTTPStatus.OK),
+    )
+)
+def test_metrics_availability(parametrized_client, expected_status):
+    """Метрики запросов доступны только персоналу."""
+    response = parametrized_client.get(reverse('metrics'))
+    assert response.status_code == expected_status
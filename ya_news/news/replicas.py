@@ -0,0 +1,144 @@
+import asyncio
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Псевдоним БД, из которой читает текущий запрос.
+_read_alias = ContextVar('news_read_alias', default=DEFAULT_DB_ALIAS)
+# Была ли в текущем запросе запись в БД.
+_wrote = ContextVar('news_wrote', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Приложения, которые всегда читают из default: сессия, не дошедшая
+# до реплики, разлогинила бы пользователя.
+PRIMARY_APPS = ('sessions',)
+
+
+class ReplicaRouter:
+    """
+    Чтение из реплики, выбранной для запроса, запись — в default.
+
+    Вне запросов (команды, фоновая модерация), внутри транзакций
+    и для сессий всё читается из default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label in PRIMARY_APPS
+            # Реплика не видит незавершённую транзакцию.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии default, объекты из разных БД совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными от репликатора.
+        return db not in settings.NEWS_READ_REPLICAS
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Чтение из default внутри блока.
+
+    Нужно там, где прочитанное переживёт запрос, например при заполнении
+    кеша: отстающая реплика положила бы в него устаревшую страницу.
+    """
+    token = _read_alias.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Выбирает БД для чтения на время запроса.
+
+    Безопасные запросы читают из случайной реплики из NEWS_READ_REPLICAS,
+    так что чтение масштабируется добавлением реплик. Запросы, которые
+    что-то меняют, целиком работают с default. После записи клиенту
+    ставится cookie, и пока реплики догоняют default, его запросы
+    тоже читают из default: пользователь сразу видит свой комментарий.
+
+    Работает и в синхронной, и в асинхронной цепочке middleware:
+    контекстные переменные ставятся и сбрасываются вокруг вызова
+    get_response в одном контексте, их видят представление и код,
+    который оно запускает в потоках.
+    """
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'news_read_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как у MiddlewareMixin: обработчик вызовет экземпляр
+            # как асинхронную функцию.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def choose_alias(self, request):
+        replicas = settings.NEWS_READ_REPLICAS
+        if (
+            not replicas
+            or request.method not in SAFE_METHODS
+            or self.cookie_name in request.COOKIES
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def pin_after_write(self, response, wrote):
+        if wrote and settings.NEWS_READ_REPLICAS:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.NEWS_REPLICA_LAG_SECONDS, httponly=True,
+            )
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        alias_token = _read_alias.set(self.choose_alias(request))
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _read_alias.reset(alias_token)
+            _wrote.reset(wrote_token)
+        return self.pin_after_write(response, wrote)
+
+    async def __acall__(self, request):
+        alias_token = _read_alias.set(self.choose_alias(request))
+        wrote_token = _wrote.set(False)
+        try:
+            response = await self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _read_alias.reset(alias_token)
+            _wrote.reset(wrote_token)
+        return self.pin_after_write(response, wrote)
+
+
+def replicate(source, target):
+    """
+    Копирует SQLite-БД source в target через backup API sqlite3.
+
+    Замена настоящей репликации для локальной проверки: копия
+    целостная, читатели реплики ждут её окончания до busy_timeout.
+    """
+    source.ensure_connection()
+    target.ensure_connection()
+    with target.wrap_database_errors:
+        source.connection.backup(target.connection)
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_news_pages
+from .models import Comment, News, make_excerpt
+
+
+@receiver(pre_save, sender=News)
+def fill_raw_news(sender, instance, raw, **kwargs):
+    """
+    Время изменения и анонс для новостей из фикстур.
+
+    Команда loaddata сохраняет объекты с raw=True: поля auto_now
+    не заполняются, а News.save(), где вычисляется анонс, не вызывается.
+    """
+    if not raw:
+        return
+    if instance.updated is None:
+        instance.updated = timezone.now()
+    if not instance.excerpt:
+        instance.excerpt = make_excerpt(instance.text)
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news_cache(sender, instance, **kwargs):
+    invalidate_news_pages(instance.pk)
+
+
+# Только post_save: получатель post_delete не дал бы Django удалять
+# комментарии новости одним запросом. Удаление комментария обновляет
+# новость и кеш в CommentDelete и в админке.
+@receiver(post_save, sender=Comment)
+def invalidate_comment_news_cache(sender, instance, **kwargs):
+    News.objects.filter(pk=instance.news_id).touch()
+    invalidate_news_pages(instance.news_id)
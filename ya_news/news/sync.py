@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+@lru_cache(maxsize=None)
+def get_executor(threads):
+    return ThreadPoolExecutor(threads, thread_name_prefix='news-sync')
+
+
+def call_with_connections(func, *args, **kwargs):
+    """
+    Соединения потоков пула живут по тем же правилам, что у запросов:
+    до и после вызова закрываются устаревшие по CONN_MAX_AGE
+    и непригодные после ошибки.
+    """
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Выполняет блокирующий код (ORM, кеш) из асинхронного представления.
+
+    Код уходит в отдельный пул из NEWS_ASYNC_THREADS потоков, так что
+    вызовы одного запроса через asyncio.gather идут одновременно, а цикл
+    событий в это время обслуживает другие запросы. У каждого потока пула
+    своё соединение с БД, при CONN_MAX_AGE > 0 оно переиспользуется
+    между запросами. Контекстные переменные, например выбранная реплика,
+    передаются в поток.
+
+    При NEWS_ASYNC_THREADS = 0 код выполняется в потоке запроса,
+    как у sync_to_async по умолчанию.
+    """
+    threads = settings.NEWS_ASYNC_THREADS
+    if not threads:
+        return await sync_to_async(func)(*args, **kwargs)
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(threads),
+        partial(context.run, call_with_connections, func, *args, **kwargs),
+    )
@@ -6,11 +6,23 @@ app_name = 'news'
 
 urlpatterns = [
     path('', views.NewsList.as_view(), name='home'),
+    path('archive/', views.NewsArchive.as_view(), name='archive'),
     path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path('async/', views.news_list_async, name='home_async'),
+    path(
+        'async/news/<int:pk>/',
+        views.news_detail_async,
+        name='detail_async'
+    ),
 ]
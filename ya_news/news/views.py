@@ -1,16 +1,45 @@
+import asyncio
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.views import generic
 
+from .cache import (
+    AnonymousCacheMixin, cached_for_anonymous, invalidate_news_pages,
+    page_cache_key
+)
 from .forms import CommentForm
+from .mixins import ConditionalGetMixin
 from .models import Comment, News
+from .pagination import InvalidCursor, keyset_paginate
+from .replicas import SAFE_METHODS
+from .sync import run_sync
+
+
+def get_comments_page(request, news_id):
+    """Страница комментариев новости, видимых пользователю запроса."""
+    try:
+        return keyset_paginate(
+            Comment.objects.filter(news_id=news_id).visible_to(
+                request.user
+            ).select_related('author'),
+            request.GET.get('cursor'),
+            settings.COMMENTS_COUNT_ON_PAGE,
+            keys=('created', 'id'),
+        )
+    except InvalidCursor:
+        raise Http404('Некорректный курсор комментариев.')
 
 
-class NewsList(generic.ListView):
+class NewsList(AnonymousCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
+    cache_name = 'home'
     template_name = 'news/home.html'
 
     def get_queryset(self):
@@ -18,22 +47,60 @@ class NewsList(generic.ListView):
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Количество комментариев берём из денормализованного счётчика,
+        поэтому сами комментарии не загружаем.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.for_list()[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
 
 
-class NewsDetail(generic.DetailView):
+class NewsArchive(AnonymousCacheMixin, generic.ListView):
+    """Архив новостей с пагинацией по ключу (date, id)."""
     model = News
-    template_name = 'news/detail.html'
+    cache_name = 'archive'
+    template_name = 'news/archive.html'
+
+    def get_queryset(self):
+        try:
+            self.page = keyset_paginate(
+                self.model.objects.for_list(),
+                self.request.GET.get('cursor'),
+                settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+                keys=('date', 'id'),
+                descending=True,
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор архива.')
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
+
+
+class CommentPageMixin:
+    """Постраничная выдача комментариев новости по ключу (created, id)."""
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = get_comments_page(self.request, self.object.pk)
+        return context
+
+
+class NewsDetail(
+        AnonymousCacheMixin,
+        ConditionalGetMixin,
+        CommentPageMixin,
+        generic.DetailView
+):
+    model = News
+    cache_name = 'detail'
+    template_name = 'news/detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +109,36 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(CommentPageMixin, generic.DetailView):
+    """
+    Очередная страница комментариев для подгрузки на странице новости.
+
+    По умолчанию отдаёт HTML-фрагмент, с параметром format=json — JSON.
+    """
+    model = News
+    template_name = 'news/includes/comments.html'
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super().render_to_response(context, **response_kwargs)
+        page = context['comments']
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': str(comment.author),
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in page
+            ],
+            'next_cursor': page.next_cursor,
+        })
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CommentPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -56,9 +151,16 @@ class NewsComment(
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
+        """
+        Комментарий попадает в очередь модерации.
+
+        Проверяют и публикуют его фоновые обработчики moderate_comments,
+        счётчик комментариев новости обновляется при публикации.
+        """
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
+        comment.status = Comment.Status.PENDING
         comment.save()
         return super().form_valid(form)
 
@@ -98,7 +200,75 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """Изменённый комментарий заново проходит модерацию."""
+        form.instance.status = Comment.Status.PENDING
+        with transaction.atomic():
+            response = super().form_valid(form)
+            News.objects.filter(
+                pk=self.object.news_id
+            ).recount_comments()
+        return response
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().delete(request, *args, **kwargs)
+            News.objects.filter(pk=self.object.news_id).recount_comments()
+            invalidate_news_pages(self.object.news_id)
+        return response
+
+
+async def news_list_async(request):
+    """
+    Асинхронный вариант NewsList для ASGI.
+
+    Ответ тот же и кешируется под тем же ключом, а пока идёт запрос
+    к БД, цикл событий обслуживает другие запросы.
+    """
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+
+    async def get_response():
+        news_list = await run_sync(
+            lambda: list(
+                News.objects.for_list()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+            )
+        )
+        return TemplateResponse(
+            request, 'news/home.html', {'object_list': news_list}
+        )
+
+    return await cached_for_anonymous(
+        request, page_cache_key('home'), get_response
+    )
+
+
+async def news_detail_async(request, pk):
+    """
+    Асинхронный вариант NewsDetail для ASGI.
+
+    Новость и страница комментариев читаются одновременно в разных
+    потоках. Комментарии отправляются через синхронный маршрут
+    news:detail.
+    """
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+
+    async def get_response():
+        news, comments = await asyncio.gather(
+            run_sync(get_object_or_404, News, pk=pk),
+            run_sync(get_comments_page, request, pk),
+        )
+        context = {'object': news, 'news': news, 'comments': comments}
+        if request.user.is_authenticated:
+            context['form'] = CommentForm()
+        return TemplateResponse(request, 'news/detail.html', context)
+
+    return await cached_for_anonymous(
+        request, page_cache_key('detail', pk), get_response
+    )
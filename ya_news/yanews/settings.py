@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.metrics.RequestMetricsMiddleware',
+    'news.replicas.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +60,31 @@ DATABASES = {
     }
 }
 
+# Сколько потоков выполняют ORM для асинхронных представлений,
+# 0 — выполнять в потоке запроса. См. news/sync.py.
+NEWS_ASYNC_THREADS = 8
+
+# Сбор метрик запросов, см. yanews/metrics.py.
+REQUEST_METRICS = False
+
+DATABASE_ROUTERS = ['news.replicas.ReplicaRouter']
+
+# Псевдонимы БД-реплик, из которых читают безопасные запросы, и сколько
+# секунд после записи пользователь читает из default, пока реплики
+# не догонят основную БД. Пустой список — всё читается из default.
+NEWS_READ_REPLICAS = []
+NEWS_REPLICA_LAG_SECONDS = 10
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Псевдоним кеша для страниц новостей и время жизни записи в секундах.
+NEWS_CACHE_ALIAS = 'default'
+NEWS_CACHE_TIMEOUT = 60 * 15
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +107,17 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+NEWS_COUNT_ON_ARCHIVE_PAGE = 10
+
+COMMENTS_COUNT_ON_PAGE = 50
+
+# Файл с дополнительными запрещёнными словами, по одному на строку.
+BAD_WORDS_FILE = None
+
+# Проверки, которые фоновая модерация применяет к новым комментариям.
+COMMENT_MODERATION_CHECKS = [
+    'news.moderation.check_bad_words',
+    'news.moderation.check_links',
+]
+COMMENT_MAX_LINKS = 2
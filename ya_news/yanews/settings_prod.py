@@ -0,0 +1,90 @@
+"""
+Настройки для эксплуатации.
+
+По умолчанию БД — SQLite в режиме WAL: читатели не ждут писателя,
+писатели ждут друг друга до busy_timeout, а не падают сразу.
+Если задана переменная окружения POSTGRES_DB, используется PostgreSQL
+через пул соединений PgBouncer.
+
+Реплики для чтения задаются переменными окружения: SQLITE_REPLICAS —
+число файлов-копий, которые обновляет команда replicate_db,
+POSTGRES_REPLICA_HOSTS — адреса реплик PostgreSQL через запятую.
+"""
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', 'localhost').split(',')
+
+# Шаблоны читаются с диска и компилируются один раз на процесс.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+# Соединение с БД переиспользуется запросами в течение этого времени.
+CONN_MAX_AGE = 60
+
+SQLITE_DATABASE = {
+    'ENGINE': 'yanews.sqlite',
+    'NAME': BASE_DIR / 'db.sqlite3',
+    'CONN_MAX_AGE': CONN_MAX_AGE,
+    'OPTIONS': {
+        # Секунды, которые драйвер ждёт снятия блокировки.
+        'timeout': 5,
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+        },
+    },
+}
+
+# PgBouncer в режиме transaction держит пул соединений с PostgreSQL,
+# а Django держит постоянное соединение с PgBouncer. Курсоры на стороне
+# сервера с таким пулом не работают, поэтому они отключены. Нужен
+# драйвер psycopg2.
+POSTGRES_DATABASE = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.getenv('POSTGRES_DB'),
+    'USER': os.getenv('POSTGRES_USER', ''),
+    'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+    'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+    'PORT': os.getenv('POSTGRES_PORT', '6432'),
+    'CONN_MAX_AGE': CONN_MAX_AGE,
+    'DISABLE_SERVER_SIDE_CURSORS': True,
+}
+
+
+def replica(database, **changes):
+    """Реплика с настройками основной БД; в тестах — её зеркало."""
+    return {**database, **changes, 'TEST': {'MIRROR': 'default'}}
+
+
+if os.getenv('POSTGRES_DB'):
+    DATABASES = {'default': POSTGRES_DATABASE}
+    hosts = os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',')
+    for number, host in enumerate(filter(None, hosts), start=1):
+        DATABASES[f'replica{number}'] = replica(POSTGRES_DATABASE, HOST=host)
+else:
+    DATABASES = {'default': SQLITE_DATABASE}
+    for number in range(1, int(os.getenv('SQLITE_REPLICAS', '0')) + 1):
+        DATABASES[f'replica{number}'] = replica(
+            SQLITE_DATABASE, NAME=BASE_DIR / f'db_replica{number}.sqlite3'
+        )
+
+NEWS_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
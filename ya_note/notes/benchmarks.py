@@ -0,0 +1,161 @@
+import json
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import URLResolver, get_resolver, reverse
+
+from .models import Note
+from .search import get_search_backend
+
+# Пространства имён, которые не относятся к проекту.
+SKIPPED_NAMESPACES = ('admin',)
+PERCENTILES = (50, 90, 95, 99)
+WORDS = (
+    'список', 'покупок', 'планы', 'встреча', 'идеи', 'проект', 'рецепт',
+    'книги', 'лекции', 'отчёт', 'задание', 'звонок', 'маршрут', 'подарки',
+)
+
+
+def generate_dataset(users, notes_per_user, batch_size=5000):
+    """
+    Создаёт пользователей с заметками и заполняет поисковый индекс.
+
+    Заметки пишутся через bulk_create с готовыми slug, поэтому
+    индекс строится отдельно, пачками. Возвращает первого пользователя.
+    """
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        user_model(username=f'bench-{index}') for index in range(users)
+    )
+    authors = list(
+        user_model.objects.filter(username__startswith='bench-')
+        .order_by('id').values_list('id', flat=True)
+    )
+    notes = []
+    for author_id in authors:
+        for index in range(notes_per_user):
+            words = [WORDS[(index + shift) % len(WORDS)] for shift in (0, 3)]
+            notes.append(Note(
+                title=f'{" ".join(words).capitalize()} {index}',
+                text=f'Текст заметки {index}: {" ".join(words)}. ' * 5,
+                slug=f'bench-{author_id}-{index}',
+                author_id=author_id,
+            ))
+            if len(notes) >= batch_size:
+                Note.objects.bulk_create(notes)
+                notes = []
+    Note.objects.bulk_create(notes)
+    backend = get_search_backend()
+    batch = []
+    for note in Note.objects.iterator(chunk_size=batch_size):
+        batch.append(note)
+        if len(batch) >= batch_size:
+            backend.index_many(batch)
+            batch = []
+    backend.index_many(batch)
+    return user_model.objects.get(pk=authors[0])
+
+
+def named_urls(patterns=None, namespace=None):
+    """Все имена маршрутов проекта вида namespace:name."""
+    names = set()
+    for pattern in patterns or get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in SKIPPED_NAMESPACES:
+                continue
+            names |= named_urls(
+                pattern.url_patterns, pattern.namespace or namespace
+            )
+        elif pattern.name:
+            names.add(f'{namespace}:{pattern.name}' if namespace else
+                      pattern.name)
+    return names
+
+
+def url_cases(author):
+    """Сценарии замера: ключ, имя маршрута, аргументы, параметры, клиент."""
+    slug = Note.objects.filter(author=author).values_list(
+        'slug', flat=True
+    ).first()
+    return (
+        ('notes:home', 'notes:home', None, None, 'author'),
+        ('notes:add', 'notes:add', None, None, 'author'),
+        ('notes:edit', 'notes:edit', (slug,), None, 'author'),
+        ('notes:detail', 'notes:detail', (slug,), None, 'author'),
+        ('notes:delete', 'notes:delete', (slug,), None, 'author'),
+        ('notes:list', 'notes:list', None, None, 'author'),
+        ('notes:search', 'notes:search', None, {'q': WORDS[0]}, 'author'),
+        ('notes:import', 'notes:import', None, None, 'author'),
+        ('notes:export', 'notes:export', None, None, 'author'),
+        ('notes:success', 'notes:success', None, None, 'author'),
+        ('users:login', 'users:login', None, None, 'anonymous'),
+        ('users:logout', 'users:logout', None, None, 'anonymous'),
+        ('users:signup', 'users:signup', None, None, 'anonymous'),
+        ('metrics', 'metrics', None, None, 'author'),
+    )
+
+
+def percentiles(durations):
+    """Процентили PERCENTILES; при одном замере все равны ему."""
+    if len(durations) > 1:
+        cuts = statistics.quantiles(durations, n=100, method='inclusive')
+    else:
+        cuts = durations * 99
+    return {
+        f'p{percentile}': round(cuts[percentile - 1], 3)
+        for percentile in PERCENTILES
+    }
+
+
+def measure_url(client, url, requests, warmup):
+    """Задержки запросов в миллисекундах и пропускная способность."""
+    durations = []
+    for number in range(warmup + requests):
+        started = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        duration = time.perf_counter() - started
+        if response.status_code >= 500:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        if number >= warmup:
+            durations.append(duration * 1000)
+    result = percentiles(durations)
+    result['mean'] = round(statistics.fmean(durations), 3)
+    result['rps'] = round(1000 * len(durations) / sum(durations), 1)
+    result['status'] = response.status_code
+    return result
+
+
+def run_benchmark(author, requests, warmup):
+    clients = {'anonymous': Client(), 'author': Client()}
+    clients['author'].force_login(author)
+    results = {}
+    for key, name, args, query, client in url_cases(author):
+        url = reverse(name, args=args)
+        if query:
+            url = f'{url}?{urlencode(query)}'
+        results[key] = measure_url(clients[client], url, requests, warmup)
+    return results
+
+
+def compare(results, baseline_path):
+    """Строки сравнения p50 и p95 с результатами из другого прогона."""
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = json.load(file)['urls']
+    lines = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            lines.append(f'{key}: нет в {baseline_path}')
+            continue
+        changes = ', '.join(
+            f'{metric} {previous[metric]:.2f} → {current[metric]:.2f} мс '
+            f'({(current[metric] / previous[metric] - 1) * 100:+.0f}%)'
+            for metric in ('p50', 'p95')
+        )
+        lines.append(f'{key}: {changes}')
+    return lines
@@ -1,7 +1,4 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
 
 from .models import Note
 
@@ -15,15 +12,27 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Уникальность slug здесь не проверяем.
+
+        Отдельный запрос не защищает от одновременной записи, поэтому
+        конфликт ловит уникальный индекс при сохранении: см. save_note
+        в представлениях и Note.save для пустого slug.
+        """
+
+    def add_slug_conflict_error(self, slug):
+        self.add_error('slug', slug + WARNING)
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки файла с заметками для импорта."""
+    file = forms.FileField(label='Файл')
+    format = forms.ChoiceField(
+        label='Формат',
+        choices=(('ndjson', 'NDJSON'), ('csv', 'CSV')),
+        help_text=(
+            'NDJSON: по JSON-объекту на строку, CSV: с заголовком. '
+            'Поля: title, text, slug.'
+        ),
+    )
@@ -0,0 +1,61 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+from pytils.translit import slugify
+
+from notes.slugs import cached_slugify
+
+WORDS = (
+    'список', 'покупок', 'планы', 'на', 'неделю', 'встреча', 'с', 'командой',
+    'идеи', 'для', 'проекта', 'рецепт', 'борща', 'книги', 'прочитать',
+    'заметки', 'лекции', 'отчёт', 'за', 'месяц', 'дела', 'домашние',
+    'задание', 'важное', 'напоминание', 'звонок', 'врачу', 'путешествие',
+    'маршрут', 'подарки', 'день', 'рождения', 'черновик', 'статьи',
+)
+
+
+def title_corpus(size, distinct, rng):
+    """
+    Заголовки с частыми повторами, как в реальных импортах.
+
+    Берётся distinct уникальных заголовков из 2–5 слов, частоты
+    распределены по закону Ципфа.
+    """
+    titles = [
+        ' '.join(rng.choices(WORDS, k=rng.randint(2, 5))).capitalize()
+        for _ in range(distinct)
+    ]
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return rng.choices(titles, weights=weights, k=size)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость slugify из pytils и кешированной версии.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--distinct', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        corpus = title_corpus(
+            options['titles'],
+            options['distinct'],
+            random.Random(options['seed']),
+        )
+        cached_slugify.cache_clear()
+        plain_time = timeit.timeit(
+            lambda: [slugify(title) for title in corpus], number=1
+        )
+        cached_time = timeit.timeit(
+            lambda: [cached_slugify(title) for title in corpus], number=1
+        )
+        info = cached_slugify.cache_info()
+        self.stdout.write(
+            f'Заголовков: {len(corpus)}, уникальных: {options["distinct"]}\n'
+            f'pytils: {len(corpus) / plain_time:,.0f} заголовков/с\n'
+            f'С кешем: {len(corpus) / cached_time:,.0f} заголовков/с '
+            f'(попаданий {info.hits}, промахов {info.misses})\n'
+            f'Ускорение: {plain_time / cached_time:.1f}x'
+        )
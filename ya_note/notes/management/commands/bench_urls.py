@@ -0,0 +1,93 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from notes.benchmarks import (
+    compare, generate_dataset, named_urls, run_benchmark, url_cases
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки и пропускную способность всех маршрутов '
+        'на синтетических данных во временной тестовой БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--notes-per-user', type=int, default=1000)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Сколько замеряемых запросов отправить на каждый маршрут.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Сколько запросов отправить до начала замера.',
+        )
+        parser.add_argument(
+            '--metrics', action='store_true',
+            help='Включить сбор метрик запросов, чтобы замерить его цену.',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON с результатами прошлого прогона.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть не меньше 1.')
+        dataset = {
+            'users': options['users'],
+            'notes_per_user': options['notes_per_user'],
+        }
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                REQUEST_METRICS=options['metrics'],
+            ):
+                started = time.monotonic()
+                author = generate_dataset(
+                    dataset['users'], dataset['notes_per_user']
+                )
+                setup_time = time.monotonic() - started
+                missing = named_urls() - {
+                    name for _, name, _, _, _ in url_cases(author)
+                }
+                if missing:
+                    raise CommandError(
+                        'Нет сценария замера для: '
+                        + ', '.join(sorted(missing))
+                    )
+                results = run_benchmark(
+                    author, options['requests'], options['warmup']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        report = {
+            'project': 'ya_note',
+            'dataset': dataset,
+            'setup_seconds': round(setup_time, 2),
+            'requests': options['requests'],
+            'metrics': options['metrics'],
+            'urls': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Данные созданы за {setup_time:.1f} с')
+        for key, result in results.items():
+            self.stdout.write(
+                f'{key}: p50 {result["p50"]:.2f} мс, '
+                f'p95 {result["p95"]:.2f} мс, {result["rps"]:.0f} запросов/с'
+            )
+        if options['compare']:
+            self.stdout.write('Сравнение с ' + options['compare'])
+            for line in compare(results, options['compare']):
+                self.stdout.write(line)
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_updated'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, help_text='Укажите адрес для страницы заметки. Используйте только латиницу, цифры, дефисы и знаки подчёркивания', max_length=100, verbose_name='Адрес для страницы с заметкой'),
+        ),
+        migrations.AddConstraint(
+            model_name='note',
+            constraint=models.UniqueConstraint(fields=('slug',), name='note_slug_unique'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.utils.cache import get_conditional_response, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified, если объект DetailView не изменился.
+
+    ETag строится из поля updated объекта и пользователя, которому видна
+    страница. Last-Modified не отдаётся: в нём время с точностью
+    до секунды, и после двух изменений за одну секунду клиент
+    с If-Modified-Since получил бы устаревшую страницу.
+
+    Объект загружается один раз и используется дальше представлением,
+    при ответе 304 шаблон не отрисовывается.
+    """
+
+    def get_object(self, queryset=None):
+        if getattr(self, 'object', None) is None:
+            self.object = super().get_object(queryset)
+        return self.object
+
+    def get_etag(self, obj):
+        user_id = self.request.user.pk or 0
+        return quote_etag(f'{obj.pk}-{obj.updated.timestamp()}-{user_id}')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag = self.get_etag(self.get_object())
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
@@ -1,7 +1,8 @@
 from django.conf import settings
 from django.db import models
 
-from pytils.translit import slugify
+from .search import get_search_backend
+from .slugs import SLUG_CONSTRAINT, cached_slugify, save_with_unique_slug
 
 
 class Note(models.Model):
@@ -18,8 +19,9 @@ class Note(models.Model):
     slug = models.SlugField(
         'Адрес для страницы с заметкой',
         max_length=100,
-        unique=True,
         blank=True,
+        # Поиск по slug идёт по индексу ограничения SLUG_CONSTRAINT.
+        db_index=False,
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
@@ -27,12 +29,31 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('slug',), name=SLUG_CONSTRAINT),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Пустой slug строится из заголовка.
+
+        Если такой уже занят, к нему добавляется суффикс -2, -3 и т. д.
+        """
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(
+                self,
+                super().save,
+                cached_slugify(self.title),
+                self._meta.get_field('slug').max_length,
+                *args,
+                **kwargs,
+            )
+        get_search_backend().index(self)
@@ -0,0 +1,186 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+WORD = re.compile(r'\w+')
+
+
+class SearchBackend:
+    """
+    Интерфейс поискового индекса заметок.
+
+    Индекс обновляется по одной заметке при сохранении и удалении,
+    поиск возвращает id заметок автора в порядке релевантности.
+    """
+
+    def index(self, note):
+        raise NotImplementedError
+
+    def index_many(self, notes):
+        for note in notes:
+            self.index(note)
+
+    def remove(self, note_id):
+        raise NotImplementedError
+
+    def count(self, author, query):
+        raise NotImplementedError
+
+    def search(self, author, query, offset, limit):
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Поиск без индекса, по вхождению слов; для СУБД без FTS5."""
+
+    def index(self, note):
+        pass
+
+    def remove(self, note_id):
+        pass
+
+    def _filter(self, author, query):
+        from .models import Note
+
+        notes = Note.objects.filter(author=author)
+        for word in WORD.findall(query):
+            notes = notes.filter(title__icontains=word) | notes.filter(
+                text__icontains=word
+            )
+        return notes
+
+    def count(self, author, query):
+        return self._filter(author, query).count()
+
+    def search(self, author, query, offset, limit):
+        notes = self._filter(author, query).order_by('-id')
+        return list(notes.values_list('id', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Полнотекстовый индекс на виртуальной таблице SQLite FTS5.
+
+    Таблица создаётся миграцией, rowid строки совпадает с id заметки.
+    Автор хранится отдельной индексируемой колонкой, поэтому фильтр
+    по автору тоже выполняется по индексу, а не перебором совпадений.
+    Слова запроса ищутся только в заголовке и тексте, иначе запрос
+    вида u1 совпадал бы с токеном автора в каждой заметке.
+    Результаты ранжируются по bm25, заголовок весит больше текста.
+    """
+    table = 'notes_note_fts'
+
+    @staticmethod
+    def _author_token(author_id):
+        return f'u{author_id}'
+
+    def _match(self, author, query):
+        words = WORD.findall(query)
+        if not words:
+            return None
+        terms = ' '.join(f'"{word}"*' for word in words)
+        return (
+            f'author : "{self._author_token(author.pk)}" '
+            f'AND {{title text}} : ({terms})'
+        )
+
+    def index(self, note):
+        self.index_many([note])
+
+    def index_many(self, notes):
+        rows = [
+            (
+                note.pk,
+                note.title,
+                note.text,
+                self._author_token(note.author_id),
+            )
+            for note in notes
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, text, author) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, note_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', (note_id,)
+            )
+
+    def count(self, author, query):
+        match = self._match(author, query)
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s',
+                (match,),
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, author, query, offset, limit):
+        match = self._match(author, query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, 10.0, 1.0, 0.0) '
+                'LIMIT %s OFFSET %s',
+                (match, limit, offset),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    return _load_backend(settings.NOTES_SEARCH_BACKEND)
+
+
+class SearchResults:
+    """
+    Ленивый список найденных заметок для Paginator.
+
+    Из индекса запрашивается только нужный срез id, заметки
+    подгружаются одним запросом и выводятся в порядке релевантности.
+    """
+
+    def __init__(self, author, query, backend=None):
+        from .models import Note
+
+        self.model = Note
+        self.author = author
+        self.query = query
+        self.backend = backend or get_search_backend()
+
+    def count(self):
+        return self.backend.count(self.author, self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        offset = item.start or 0
+        ids = self.backend.search(
+            self.author, self.query, offset, item.stop - offset
+        )
+        notes = self.model.objects.in_bulk(ids)
+        return [notes[note_id] for note_id in ids if note_id in notes]
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Note
+from .search import get_search_backend
+
+
+@receiver(post_delete, sender=Note)
+def remove_note_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
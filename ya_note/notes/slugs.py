@@ -0,0 +1,124 @@
+from functools import lru_cache
+from itertools import count
+
+from django.db import IntegrityError, transaction
+from pytils.translit import slugify
+
+MAX_ATTEMPTS = 10
+# Длина суффикса, под которую обрезается основа при поиске занятых slug.
+SUFFIX_RESERVE = len('-999999999')
+SLUGIFY_CACHE_SIZE = 4096
+# Уникальное ограничение slug заметок, см. Note.Meta.constraints.
+SLUG_CONSTRAINT = 'note_slug_unique'
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def cached_slugify(title):
+    """
+    Транслитерация pytils с ограниченным LRU-кешем.
+
+    Один и тот же заголовок часто транслитерируется несколько раз подряд:
+    при сохранении формы, при импорте типовых заголовков.
+    """
+    return slugify(title)
+
+
+def slugify_cache_stats():
+    """Счётчики кеша транслитерации для мониторинга."""
+    info = cached_slugify.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+    }
+
+
+def numbered_slug(base, max_length, number):
+    """Вариант base-number, обрезанный под максимальную длину."""
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def slug_candidates(base, max_length):
+    """base, затем base-2, base-3… с обрезкой под максимальную длину."""
+    yield base[:max_length]
+    for number in count(2):
+        yield numbered_slug(base, max_length, number)
+
+
+def highest_slug_number(model, base, max_length):
+    """
+    Наибольший занятый номер среди вариантов base-2, base-3…
+
+    Один запрос по префиксу основы вместо перебора вариантов по одному.
+    Для занятого base без суффиксов возвращается 1.
+    """
+    highest = 1
+    slugs = model._default_manager.filter(
+        slug__startswith=base[:max_length - SUFFIX_RESERVE]
+    ).values_list('slug', flat=True)
+    for slug in slugs.iterator():
+        number = slug.rpartition('-')[2]
+        if (
+            number.isdigit()
+            and int(number) > highest
+            and slug == numbered_slug(base, max_length, int(number))
+        ):
+            highest = int(number)
+    return highest
+
+
+def is_slug_conflict(error, model):
+    """
+    Нарушено ли ограничение SLUG_CONSTRAINT модели.
+
+    Решение принимается по исходной ошибке драйвера БД: PostgreSQL
+    сообщает имя ограничения, SQLite — столбцы индекса в тексте ошибки.
+    Остальные нарушения целостности конфликтом slug не считаются.
+    """
+    cause = error.__cause__
+    diag = getattr(cause, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name == SLUG_CONSTRAINT
+    if not getattr(cause, 'args', None):
+        return False
+    constraint = next(
+        constraint for constraint in model._meta.constraints
+        if constraint.name == SLUG_CONSTRAINT
+    )
+    columns = ', '.join(
+        f'{model._meta.db_table}.{model._meta.get_field(name).column}'
+        for name in constraint.fields
+    )
+    return cause.args[0] == f'UNIQUE constraint failed: {columns}'
+
+
+def save_with_unique_slug(instance, save, base, max_length, *args, **kwargs):
+    """
+    Сохраняет объект, подбирая свободный slug.
+
+    Свободен ли slug, решает уникальный индекс: каждая попытка — это
+    один INSERT или UPDATE в точке сохранения, без предварительных
+    проверок exists(). Поэтому два одновременных сохранения с одинаковым
+    заголовком не падают, а получают разные суффиксы.
+
+    После конфликта следующий номер берётся за наибольшим занятым.
+    Если за MAX_ATTEMPTS попыток slug подобрать не удалось, выбрасывается
+    последняя ошибка конфликта: форма покажет её как занятый slug.
+    """
+    model = type(instance)
+    instance.slug = base[:max_length]
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                save(*args, **kwargs)
+        except IntegrityError as error:
+            if not is_slug_conflict(error, model):
+                raise
+            conflict = error
+        else:
+            return
+        number = highest_slug_number(model, base, max_length) + 1
+        instance.slug = numbered_slug(base, max_length, number)
+    raise conflict
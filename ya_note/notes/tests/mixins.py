@@ -0,0 +1,47 @@
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Примесь к TestCase для замера SQL-запросов отдельных страниц.
+
+    Бюджеты задаются в query_budgets: имя маршрута — допустимое число
+    запросов. Замеры (адрес, число запросов, длительность) копятся
+    в request_metrics.
+    """
+    query_budgets = {}
+
+    def setUp(self):
+        super().setUp()
+        self.request_metrics = []
+
+    def measure_request(self, client, url, method='get', **kwargs):
+        """
+        Возвращает ответ, выполненные SQL-запросы и длительность.
+
+        Потоковый ответ читается целиком, так что его запросы тоже
+        попадают в замер.
+        """
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                # Потоковый ответ читает БД, пока отдаётся клиенту.
+                response.streaming_content = list(
+                    response.streaming_content
+                )
+            duration = time.perf_counter() - started
+        self.request_metrics.append((url, len(context), duration))
+        return response, context.captured_queries, duration
+
+    def assert_query_budget(self, client, name, url, **kwargs):
+        response, queries, _ = self.measure_request(client, url, **kwargs)
+        self.assertLessEqual(
+            len(queries),
+            self.query_budgets[name],
+            '\n'.join(query['sql'] for query in queries),
+        )
+        return response
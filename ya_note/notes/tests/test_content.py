@@ -1,5 +1,9 @@
+from http import HTTPStatus
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from notes.forms import NoteForm
@@ -43,6 +47,54 @@ class TestContent(TestCase):
                 note_availability = self.note in object_list
                 self.assertIs(note_availability, availability)
 
+    def test_unchanged_note_not_modified(self):
+        """
+        Неизменившаяся заметка отдаётся как 304 без отрисовки шаблона,
+        а после редактирования — заново.
+        """
+        url = reverse('notes:detail', args=(self.note.slug,))
+        etag = self.auth_client_author.get(url)['ETag']
+        # Не больше, чем сессия, пользователь и сама заметка.
+        with CaptureQueriesContext(connection) as context:
+            response = self.auth_client_author.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertLessEqual(len(context), 3)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.templates, [])
+        self.note.text = 'Новый текст'
+        self.note.save()
+        response = self.auth_client_author.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_notes_list_is_paginated(self):
+        """Список заметок выводится страницами и без текста заметок."""
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{index}',
+                author=self.author,
+            )
+            for index in range(4)
+        )
+        url = reverse('notes:list')
+        with self.settings(NOTES_COUNT_ON_PAGE=2):
+            response = self.auth_client_author.get(url, {'page': 3})
+            self.assertEqual(len(response.context['object_list']), 1)
+            seen = []
+            params = {'after': 0}
+            while params:
+                response = self.auth_client_author.get(url, params)
+                seen.extend(response.context['object_list'])
+                next_after = response.context['next_after']
+                params = {'after': next_after} if next_after else None
+        self.assertEqual(
+            seen, list(Note.objects.filter(author=self.author).order_by('id'))
+        )
+        self.assertIn('text', seen[0].get_deferred_fields())
+
     def test_create_and_edit_note_contains_form(self):
         """На страницы создания и редактирования заметки передаются формы."""
         urls = (
@@ -55,3 +107,64 @@ class TestContent(TestCase):
                 response = self.auth_client_author.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+class TestSearch(TestCase):
+    """Тестирование полнотекстового поиска по заметкам."""
+
+    SEARCH_URL = reverse('notes:search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Вася Пупкин')
+        cls.reader = User.objects.create(username='Петя Лупкин')
+        cls.auth_client_author = Client()
+        cls.auth_client_author.force_login(cls.author)
+        cls.in_title = Note.objects.create(
+            title='Рецепт борща', text='Свёкла и капуста', author=cls.author
+        )
+        cls.in_text = Note.objects.create(
+            title='Покупки', text='Купить всё для борща', author=cls.author
+        )
+        cls.foreign = Note.objects.create(
+            title='Борщ у Пети', text='Чужая заметка', author=cls.reader
+        )
+
+    def search(self, query):
+        response = self.auth_client_author.get(
+            self.SEARCH_URL, {'q': query}
+        )
+        return list(response.context['notes'])
+
+    def test_search_ranks_own_notes(self):
+        """
+        Поиск находит только свои заметки.
+
+        Совпадение в заголовке ранжируется выше совпадения в тексте,
+        слова ищутся по началу без учёта регистра.
+        """
+        self.assertEqual(self.search('БОРЩ'), [self.in_title, self.in_text])
+
+    def test_search_ignores_author_token(self):
+        """Служебный токен автора не находится поиском."""
+        for query in ('u', f'u{self.author.pk}'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении заметки."""
+        self.in_text.text = 'Купить хлеб'
+        self.in_text.save()
+        self.assertEqual(self.search('борщ'), [self.in_title])
+        self.assertEqual(self.search('хлеб'), [self.in_text])
+        self.in_title.delete()
+        self.assertEqual(self.search('борщ'), [])
+
+    def test_search_is_paginated(self):
+        """Результаты поиска разбиваются на страницы."""
+        with self.settings(NOTES_SEARCH_RESULTS_ON_PAGE=1):
+            response = self.auth_client_author.get(
+                self.SEARCH_URL, {'q': 'борщ', 'page': 2}
+            )
+        self.assertEqual(list(response.context['notes']), [self.in_text])
+        self.assertEqual(response.context['paginator'].count, 2)
@@ -1,12 +1,26 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytils.translit import slugify
 
 from notes.forms import WARNING
 from notes.models import Note
+from notes.search import get_search_backend
+from notes.slugs import (
+    cached_slugify, is_slug_conflict, slugify_cache_stats
+)
+from yanote.metrics import UNRESOLVED, RequestMetricsMiddleware, registry
 
 User = get_user_model()
 
@@ -81,6 +95,284 @@ class TestNoteCreate(TestCase):
         expected_slug = slugify(self.form_data['title'])
         self.assertEqual(new_note.slug, expected_slug)
 
+    def test_empty_slug_gets_suffix(self):
+        """Занятый автоматический slug получает следующий суффикс."""
+        self.form_data.pop('slug')
+        base_slug = slugify(self.form_data['title'])
+        Note.objects.create(
+            title='Заголовок', text='Текст', slug=base_slug, author=self.author
+        )
+        Note.objects.create(
+            title='Заголовок',
+            text='Текст',
+            slug=f'{base_slug}-2',
+            author=self.author,
+        )
+        response = self.auth_client_author.post(
+            self.CREATE_URL, data=self.form_data
+        )
+        self.assertRedirects(response, self.DONE_URL)
+        self.assertTrue(Note.objects.filter(slug=f'{base_slug}-3').exists())
+
+    def test_many_same_titles(self):
+        """Номер после сотни одинаковых заголовков ищется одним запросом."""
+        self.form_data.pop('slug')
+        base_slug = slugify(self.form_data['title'])
+        Note.objects.bulk_create(
+            Note(
+                title='Заголовок',
+                text='Текст',
+                slug=base_slug if number == 1 else f'{base_slug}-{number}',
+                author=self.author,
+            )
+            for number in range(1, 101)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_client_author.post(
+                self.CREATE_URL, data=self.form_data
+            )
+        self.assertRedirects(response, self.DONE_URL)
+        self.assertTrue(Note.objects.filter(slug=f'{base_slug}-101').exists())
+        self.assertLessEqual(len(queries), 15)
+
+    def test_slug_attempts_exhausted(self):
+        """Если свободный slug не нашёлся, форма сообщает об ошибке."""
+        self.form_data.pop('slug')
+        base_slug = slugify(self.form_data['title'])
+        for slug in (base_slug, f'{base_slug}-2'):
+            Note.objects.create(
+                title='Заголовок', text='Текст', slug=slug, author=self.author
+            )
+        with mock.patch('notes.slugs.highest_slug_number', return_value=1):
+            response = self.auth_client_author.post(
+                self.CREATE_URL, data=self.form_data
+            )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(
+            response, 'form', 'slug', errors=(f'{base_slug}-2' + WARNING)
+        )
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_only_slug_constraint_is_conflict(self):
+        """Другие нарушения целостности конфликтом slug не считаются."""
+        note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='slug', author=self.author
+        )
+        other = Note.objects.create(
+            title='Заголовок', text='Текст', slug='other', author=self.author
+        )
+        errors = []
+        for slug in ('slug', None):
+            try:
+                with transaction.atomic():
+                    Note.objects.filter(pk=other.pk).update(slug=slug)
+            except IntegrityError as error:
+                errors.append(is_slug_conflict(error, Note))
+        self.assertEqual(errors, [True, False])
+        self.assertEqual(Note.objects.get(pk=note.pk).slug, 'slug')
+
+
+class TestImportExport(TestCase):
+    """Тесты массового импорта и выгрузки заметок."""
+
+    IMPORT_URL = reverse('notes:import')
+    EXPORT_URL = reverse('notes:export')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Вася Пупкин')
+        cls.auth_client_author = Client()
+        cls.auth_client_author.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='taken', author=cls.author
+        )
+
+    def upload(self, content, file_format='ndjson', encoding='utf-8'):
+        upload = SimpleUploadedFile(
+            f'notes.{file_format}', content.encode(encoding)
+        )
+        response = self.auth_client_author.post(
+            self.IMPORT_URL, {'file': upload, 'format': file_format}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.context['result']
+
+    def test_import_ndjson(self):
+        """
+        Импорт проверяет строки по правилам формы заметки.
+
+        Занятые и повторяющиеся slug отклоняются, пустой slug
+        подбирается с суффиксом, как при создании заметки.
+        """
+        rows = (
+            {'title': 'Первая', 'text': 'Раз', 'slug': 'first'},
+            {'title': 'Вторая', 'text': 'Два', 'slug': 'taken'},
+            {'title': 'Третья', 'text': 'Три', 'slug': 'first'},
+            {'title': 'Заголовок', 'text': 'Четыре'},
+            {'title': 'Заголовок', 'text': 'Пять'},
+            {'title': 'Без текста'},
+        )
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nмусор\n'
+        with self.settings(NOTES_IMPORT_CHUNK_SIZE=2):
+            result = self.upload(content)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(
+            [line for line, _ in result.errors], [2, 3, 6, 7]
+        )
+        base_slug = slugify('Заголовок')
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {'taken', 'first', base_slug, f'{base_slug}-2'},
+        )
+        found = get_search_backend().search(self.author, 'Пять', 0, 10)
+        self.assertEqual(found, [Note.objects.get(text='Пять').id])
+
+    def test_import_csv(self):
+        """Заметки импортируются из CSV с заголовком."""
+        result = self.upload(
+            'title,text,slug\nИз CSV,"Текст, с запятой",from-csv\n', 'csv'
+        )
+        self.assertEqual(result.created, 1)
+        note = Note.objects.get(slug='from-csv')
+        self.assertEqual(note.text, 'Текст, с запятой')
+        self.assertEqual(note.author, self.author)
+
+    def test_import_unreadable_file(self):
+        """
+        Файл не в UTF-8 или с испорченным CSV даёт ошибку строки,
+        а не ошибку сервера.
+        """
+        for content, file_format, encoding in (
+            ('{"title": "Café", "text": "Crème"}\n', 'ndjson', 'latin-1'),
+            ('title,text\nCafé,Crème\n', 'csv', 'latin-1'),
+            (f'title,text\nЗаголовок,{"я" * 200_000}\n', 'csv', 'utf-8'),
+        ):
+            with self.subTest(file_format=file_format, encoding=encoding):
+                result = self.upload(content, file_format, encoding)
+                self.assertEqual(result.created, 0)
+                self.assertEqual(len(result.errors), 1)
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_export_ndjson(self):
+        """Выгрузка отдаёт заметки автора потоком, по объекту на строку."""
+        response = self.auth_client_author.get(self.EXPORT_URL)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'title': 'Заголовок', 'text': 'Текст', 'slug': 'taken'}],
+        )
+
+    def test_export_csv(self):
+        """Выгрузка в CSV начинается со строки заголовков."""
+        response = self.auth_client_author.get(
+            self.EXPORT_URL, {'format': 'csv'}
+        )
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(
+            content.splitlines(), ['title,text,slug', 'Заголовок,Текст,taken']
+        )
+
+
+class TestSlugifyCache(TestCase):
+    """Тесты кеша транслитерации."""
+
+    def test_cached_slugify(self):
+        """Кеш отдаёт тот же slug, что и pytils, и считает попадания."""
+        title = 'Заголовок для проверки кеша'
+        cached_slugify.cache_clear()
+        self.assertEqual(cached_slugify(title), slugify(title))
+        self.assertEqual(cached_slugify(title), slugify(title))
+        stats = slugify_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+@override_settings(REQUEST_METRICS=True)
+class TestRequestMetrics(TestCase):
+    """Тесты метрик запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Вася Пупкин')
+        for index in range(3):
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст', author=cls.author
+            )
+        cls.staff_client = Client()
+        cls.staff_client.force_login(
+            User.objects.create(username='Админ', is_staff=True)
+        )
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_metrics_by_route(self):
+        """Метрики собираются по имени маршрута и выгружаются текстом."""
+        response = self.staff_client.get(reverse('notes:list'))
+        notes_list = self.staff_client.get(
+            reverse('metrics')
+        ).json()['notes:list']
+        text = self.staff_client.get(reverse('metrics'), {'format': 'text'})
+        self.assertEqual(notes_list['duration_ms']['count'], 1)
+        self.assertGreater(notes_list['sql_count']['sum'], 0)
+        self.assertGreater(notes_list['render_ms']['sum'], 0)
+        self.assertEqual(
+            notes_list['response_bytes']['sum'], len(response.content)
+        )
+        self.assertIn(
+            'request_sql_count_count{route="notes:list"} 1',
+            text.content.decode(),
+        )
+
+    def test_duplicate_queries_reported(self):
+        """Запросы, повторённые внутри одного запроса, попадают в отчёт."""
+
+        def view(request):
+            for note in Note.objects.all():
+                User.objects.filter(pk=note.author_id).exists()
+            return HttpResponse()
+
+        RequestMetricsMiddleware(view)(RequestFactory().get('/'))
+        duplicates = registry.snapshot()[UNRESOLVED]['duplicate_queries']
+        self.assertEqual(
+            list(duplicates.values()), [{'requests': 1, 'max_repeats': 3}]
+        )
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+    """Одновременное создание заметок с одинаковыми заголовками."""
+
+    THREADS = 8
+    NOTES = 40
+
+    def setUp(self):
+        super().setUp()
+        # Проверяется при запуске: настройки выбираются после импорта.
+        if connection.is_in_memory_db():
+            self.skipTest(
+                'Параллельная запись невозможна в общую БД SQLite в памяти.'
+            )
+
+    def test_concurrent_notes_get_unique_slugs(self):
+        """Ни одна из параллельных записей не падает на конфликте slug."""
+        author = User.objects.create(username='Вася Пупкин')
+
+        def create_note(index):
+            try:
+                return Note.objects.create(
+                    title='Одинаковый заголовок',
+                    text=f'Текст {index}',
+                    author=author,
+                ).slug
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            slugs = list(pool.map(create_note, range(self.NOTES)))
+        self.assertEqual(len(set(slugs)), self.NOTES)
+        self.assertEqual(Note.objects.count(), self.NOTES)
+
 
 class TestEditDelete(TestCase):
     """Тесты редактирования и удаления заметок."""
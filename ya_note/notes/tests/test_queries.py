@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from notes import urls
+from notes.benchmarks import (
+    generate_dataset, measure_url, named_urls, url_cases
+)
+from notes.models import Note
+from notes.tests.mixins import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestCase):
+    """Число SQL-запросов страниц не зависит от объёма данных."""
+
+    # Два запроса из бюджета всегда уходят на сессию и пользователя.
+    query_budgets = {
+        'notes:home': 2,
+        'notes:add': 2,
+        'notes:edit': 3,
+        'notes:detail': 3,
+        'notes:delete': 3,
+        'notes:list': 4,
+        'notes:search': 5,
+        'notes:import': 2,
+        'notes:export': 3,
+        'notes:success': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Вася Пупкин')
+        cls.auth_client_author = Client()
+        cls.auth_client_author.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', author=cls.author
+        )
+
+    def create_notes(self, count):
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{count}-{index}',
+                author=self.author,
+            )
+            for index in range(count)
+        )
+
+    def test_every_url_has_query_budget(self):
+        """Для каждого маршрута приложения объявлен бюджет запросов."""
+        names = {
+            f'{urls.app_name}:{pattern.name}'
+            for pattern in urls.urlpatterns
+        }
+        self.assertEqual(names, set(self.query_budgets))
+
+    def test_benchmark_covers_every_url(self):
+        """Нагрузочный замер bench_urls проходит по всем маршрутам проекта."""
+        author = generate_dataset(users=2, notes_per_user=3)
+        self.assertEqual(Note.objects.filter(author=author).count(), 3)
+        names = {name for _, name, _, _, _ in url_cases(author)}
+        self.assertEqual(names, named_urls())
+
+    def test_benchmark_single_request(self):
+        """Замер из одного запроса даёт равные процентили, а не ошибку."""
+        result = measure_url(
+            self.auth_client_author, reverse('notes:home'), 1, warmup=0
+        )
+        self.assertEqual(result['p50'], result['p99'])
+
+    def test_query_budgets(self):
+        """Бюджеты соблюдаются и на малом, и на стократно большем объёме."""
+        query = {'notes:search': {'q': 'Заметка'}}
+        urls_args = {
+            'notes:edit': (self.note.slug,),
+            'notes:detail': (self.note.slug,),
+            'notes:delete': (self.note.slug,),
+        }
+        for size, count in (('small', 10), ('large', 1000)):
+            self.create_notes(count)
+            for name in self.query_budgets:
+                with self.subTest(size=size, name=name):
+                    url = reverse(name, args=urls_args.get(name))
+                    response = self.assert_query_budget(
+                        self.auth_client_author, name, url,
+                        data=query.get(name),
+                    )
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
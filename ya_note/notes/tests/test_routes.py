@@ -60,6 +60,9 @@ class TestRoutes(TestCase):
             ('notes:list'),
             ('notes:add'),
             ('notes:success'),
+            ('notes:search'),
+            ('notes:import'),
+            ('notes:export'),
         )
         for name in urls:
             with self.subTest(name):
@@ -102,6 +105,9 @@ class TestRoutes(TestCase):
             ('notes:add', None),
             ('notes:success', None),
             ('notes:list', None),
+            ('notes:search', None),
+            ('notes:import', None),
+            ('notes:export', None),
         )
         login_url = reverse('users:login')
         for name, args in urls:
@@ -110,3 +116,19 @@ class TestRoutes(TestCase):
                 redirect_url = f'{login_url}?next={url}'
                 response = self.client.get(url)
                 self.assertRedirects(response, redirect_url)
+
+    def test_metrics_availability_for_staff(self):
+        """Метрики запросов доступны только персоналу."""
+        staff_client = Client()
+        staff_client.force_login(
+            User.objects.create(username='Админ', is_staff=True)
+        )
+        clients_statuses = (
+            (self.client, HTTPStatus.FOUND),
+            (self.auth_client_reader, HTTPStatus.FOUND),
+            (staff_client, HTTPStatus.OK),
+        )
+        for client, status in clients_statuses:
+            with self.subTest(status=status):
+                response = client.get(reverse('metrics'))
+                self.assertEqual(response.status_code, status)
@@ -0,0 +1,258 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .forms import WARNING, NoteForm
+from .models import Note
+from .search import get_search_backend
+from .slugs import cached_slugify, is_slug_conflict, slug_candidates
+
+FIELDS = ('title', 'text', 'slug')
+FORMATS = ('ndjson', 'csv')
+MAX_REPORTED_ERRORS = 100
+UNPARSED = 'Строка не разобрана.'
+NOT_READ = ' Остаток файла не прочитан.'
+# Сколько вариантов с суффиксом проверять одним запросом для пустого slug.
+SLUG_CANDIDATES_RESERVE = 10
+# Ограничение на число значений в одном slug__in: у SQLite есть предел
+# количества параметров запроса.
+LOOKUP_SIZE = 900
+
+
+@dataclass
+class ImportResult:
+    """Итог импорта: сколько создано и первые ошибки по номерам строк."""
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def parse_ndjson(text):
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else UNPARSED
+
+
+def read_rows(file, file_format):
+    """
+    Построчно читает загруженный файл, не загружая его в память.
+
+    Для каждой строки возвращает её номер и словарь полей либо текст
+    ошибки. Файл не в UTF-8 или с испорченным CSV читается до первой
+    такой ошибки, она возвращается последней строкой.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    if file_format == 'csv':
+        rows = enumerate(csv.DictReader(text), start=2)
+    else:
+        rows = parse_ndjson(text)
+    line = 0
+    try:
+        for line, row in rows:
+            yield line, row
+    except UnicodeDecodeError:
+        yield line + 1, f'Файл не в кодировке UTF-8.{NOT_READ}'
+    except csv.Error as error:
+        yield line + 1, f'Ошибка CSV: {error}.{NOT_READ}'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class NoteImporter:
+    """
+    Потоковый импорт заметок пачками через bulk_create.
+
+    Каждая строка проверяется правилами NoteForm. Уникальность slug
+    проверяется запросами на всю пачку; пустой slug подбирается так же,
+    как в Note.save, с суффиксами -2, -3 и т. д. Если пачку всё же опередил
+    параллельный запрос, она сохраняется построчно через Note.save.
+    """
+
+    def __init__(self, author, chunk_size=None):
+        self.author = author
+        self.chunk_size = chunk_size or settings.NOTES_IMPORT_CHUNK_SIZE
+        self.max_slug_length = Note._meta.get_field('slug').max_length
+        self.result = ImportResult()
+        # Номер следующего варианта slug для каждой основы: с него
+        # начинается поиск свободных в следующей пачке.
+        self.slug_offsets = {}
+
+    def run(self, rows):
+        for chunk in chunked(rows, self.chunk_size):
+            self.import_chunk(chunk)
+        return self.result
+
+    def validate(self, chunk):
+        notes = []
+        for line, row in chunk:
+            if isinstance(row, str):
+                self.result.add_error(line, row)
+                continue
+            form = NoteForm(
+                data={name: row.get(name) or '' for name in FIELDS}
+            )
+            if not form.is_valid():
+                messages = [
+                    f'{name}: {" ".join(errors)}'
+                    for name, errors in form.errors.items()
+                ]
+                self.result.add_error(line, '; '.join(messages))
+                continue
+            note = form.save(commit=False)
+            note.author = self.author
+            notes.append((line, note))
+        return notes
+
+    def taken_slugs(self, slugs):
+        """Какие из slug уже заняты; запросы по LOOKUP_SIZE значений."""
+        slugs = list(slugs)
+        taken = set()
+        for start in range(0, len(slugs), LOOKUP_SIZE):
+            taken.update(
+                Note.objects.filter(
+                    slug__in=slugs[start:start + LOOKUP_SIZE]
+                ).values_list('slug', flat=True)
+            )
+        return taken
+
+    def candidates(self, base, start, stop):
+        return list(enumerate(
+            islice(slug_candidates(base, self.max_slug_length), start, stop),
+            start=start,
+        ))
+
+    def assign_slugs(self, notes):
+        """
+        Проверяет занятость slug и подбирает пустые.
+
+        Для пустых slug проверяется окно вариантов base, base-2…,
+        начиная с последнего выданного в этом импорте. Если свободных
+        в окне не хватило, оно удваивается, поэтому даже для тысяч
+        одинаковых заголовков хватает нескольких запросов.
+        """
+        explicit = [note.slug for _, note in notes if note.slug]
+        pending = {}
+        for _, note in notes:
+            if not note.slug:
+                pending.setdefault(cached_slugify(note.title), []).append(note)
+        windows = {}
+        for base, group in pending.items():
+            start = self.slug_offsets.get(base, 0)
+            windows[base] = self.candidates(
+                base, start, start + len(group) + SLUG_CANDIDATES_RESERVE
+            )
+        taken = self.taken_slugs(explicit + [
+            slug for window in windows.values() for _, slug in window
+        ])
+        accepted = []
+        for line, note in notes:
+            if note.slug:
+                if note.slug in taken:
+                    self.result.add_error(line, f'slug: {note.slug}{WARNING}')
+                    continue
+                taken.add(note.slug)
+            accepted.append((line, note, bool(note.slug)))
+        self.fill_slugs(pending, windows, taken)
+        return accepted
+
+    def fill_slugs(self, pending, windows, taken):
+        """Раздаёт свободные варианты из окон, расширяя их при нехватке."""
+        while pending:
+            for base in list(pending):
+                group = pending[base]
+                for index, slug in windows[base]:
+                    if not group:
+                        break
+                    if slug not in taken:
+                        group.pop(0).slug = slug
+                        taken.add(slug)
+                        self.slug_offsets[base] = index + 1
+                if not group:
+                    del pending[base]
+                    continue
+                start = windows[base][-1][0] + 1
+                windows[base] = self.candidates(base, start, start * 2)
+            if pending:
+                taken |= self.taken_slugs(
+                    slug for base in pending for _, slug in windows[base]
+                )
+
+    def import_chunk(self, chunk):
+        notes = self.assign_slugs(self.validate(chunk))
+        if not notes:
+            return
+        try:
+            with transaction.atomic():
+                self.bulk_insert([note for _, note, _ in notes])
+        except IntegrityError:
+            self.insert_one_by_one(notes)
+            return
+        self.result.created += len(notes)
+
+    def bulk_insert(self, notes):
+        Note.objects.bulk_create(notes, batch_size=self.chunk_size)
+        # SQLite не возвращает id из bulk_create, берём их по slug.
+        ids = dict(
+            Note.objects.filter(
+                slug__in=[note.slug for note in notes]
+            ).values_list('slug', 'id')
+        )
+        for note in notes:
+            note.pk = ids[note.slug]
+        get_search_backend().index_many(notes)
+
+    def insert_one_by_one(self, notes):
+        for line, note, explicit_slug in notes:
+            note.pk = None
+            if not explicit_slug:
+                note.slug = ''
+            try:
+                with transaction.atomic():
+                    note.save()
+            except IntegrityError as error:
+                if not is_slug_conflict(error, Note):
+                    raise
+                self.result.add_error(line, f'slug: {note.slug}{WARNING}')
+                continue
+            self.result.created += 1
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(author, file_format):
+    """Построчно отдаёт заметки автора в формате NDJSON или CSV."""
+    notes = Note.objects.filter(author=author).order_by('id').values_list(
+        *FIELDS
+    ).iterator(chunk_size=settings.NOTES_IMPORT_CHUNK_SIZE)
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        for values in notes:
+            yield writer.writerow(values)
+        return
+    for values in notes:
+        yield json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False) + '\n'
@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from .forms import NoteForm, NoteImportForm
+from .mixins import ConditionalGetMixin
 from .models import Note
+from .search import SearchResults
+from .slugs import is_slug_conflict
+from .transfer import FORMATS, NoteImporter, export_rows, read_rows
 
 
 class Home(generic.TemplateView):
@@ -26,22 +33,38 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin:
+    """Сохранение заметки из формы с обработкой занятого slug."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
+    def save_note(self, note):
+        note.save()
+
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
-        return super().form_valid(form)
+        note = form.save(commit=False)
+        try:
+            with transaction.atomic():
+                self.save_note(note)
+        except IntegrityError as error:
+            if not is_slug_conflict(error, Note):
+                raise
+            form.add_slug_conflict_error(note.slug)
+            return self.form_invalid(form)
+        self.object = note
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteCreate(NoteBase, NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def save_note(self, note):
+        note.author = self.request.user
+        super().save_note(note)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -50,10 +73,91 @@ class NoteDelete(NoteBase, generic.DeleteView):
 
 
 class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+    """
+    Список всех заметок пользователя.
+
+    Выводится постранично: по номеру страницы (page) или, для длинных
+    списков, по ключу (after — id последней показанной заметки), когда
+    стоимость запроса не зависит от глубины листания. Загружаются только
+    поля, нужные шаблону.
+    """
     template_name = 'notes/list.html'
 
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_COUNT_ON_PAGE
 
-class NoteDetail(NoteBase, generic.DetailView):
+    def get_queryset(self):
+        return super().get_queryset().only(
+            'id', 'slug', 'title'
+        ).order_by('id')
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        if after is None:
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            notes = list(queryset.filter(id__gt=int(after))[:page_size + 1])
+        except ValueError:
+            raise Http404('Некорректный параметр after.')
+        has_next = len(notes) > page_size
+        notes = notes[:page_size]
+        self.next_after = notes[-1].id if has_next else None
+        return None, None, notes, has_next
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_after'] = getattr(self, 'next_after', None)
+        return context
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+    context_object_name = 'notes'
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_SEARCH_RESULTS_ON_PAGE
+
+    def get_queryset(self):
+        return SearchResults(self.request.user, self.request.GET.get('q', ''))
+
+
+class NoteImport(LoginRequiredMixin, generic.FormView):
+    """Массовый импорт заметок из файла NDJSON или CSV."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+
+    def form_valid(self, form):
+        rows = read_rows(
+            form.cleaned_data['file'], form.cleaned_data['format']
+        )
+        result = NoteImporter(self.request.user).run(rows)
+        return self.render_to_response(
+            self.get_context_data(form=form, result=result)
+        )
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Потоковая выгрузка заметок пользователя в NDJSON или CSV."""
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', 'ndjson')
+        if file_format not in FORMATS:
+            raise Http404('Неизвестный формат выгрузки.')
+        response = StreamingHttpResponse(
+            export_rows(request.user, file_format),
+            content_type=f'{self.content_types[file_format]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{file_format}"'
+        )
+        return response
+
+
+class NoteDetail(NoteBase, ConditionalGetMixin, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
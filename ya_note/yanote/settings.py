@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,9 +57,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая БД в файле, чтобы тесты с потоками могли писать
+        # в неё одновременно: общая БД в памяти так не умеет.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Сбор метрик запросов, см. yanote/metrics.py.
+REQUEST_METRICS = False
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +96,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Поисковый индекс заметок: SQLiteFTSBackend требует SQLite с FTS5,
+# для других СУБД подойдёт notes.search.SimpleSearchBackend.
+NOTES_SEARCH_BACKEND = 'notes.search.SQLiteFTSBackend'
+NOTES_SEARCH_RESULTS_ON_PAGE = 20
+
+NOTES_COUNT_ON_PAGE = 50
+
+# Сколько заметок импорт проверяет и вставляет за одну транзакцию.
+NOTES_IMPORT_CHUNK_SIZE = 1000
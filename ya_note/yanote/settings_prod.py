@@ -0,0 +1,59 @@
+"""
+Настройки для эксплуатации.
+
+По умолчанию БД — SQLite в режиме WAL: читатели не ждут писателя,
+писатели ждут друг друга до busy_timeout, а не падают сразу.
+Если задана переменная окружения POSTGRES_DB, используется PostgreSQL
+через пул соединений PgBouncer.
+"""
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', 'localhost').split(',')
+
+# Соединение с БД переиспользуется запросами в течение этого времени.
+CONN_MAX_AGE = 60
+
+SQLITE_DATABASE = {
+    'ENGINE': 'yanote.sqlite',
+    'NAME': BASE_DIR / 'db.sqlite3',
+    'CONN_MAX_AGE': CONN_MAX_AGE,
+    'OPTIONS': {
+        # Секунды, которые драйвер ждёт снятия блокировки.
+        'timeout': 5,
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+        },
+    },
+}
+
+# PgBouncer в режиме transaction держит пул соединений с PostgreSQL,
+# а Django держит постоянное соединение с PgBouncer. Курсоры на стороне
+# сервера с таким пулом не работают, поэтому они отключены. Нужен
+# драйвер psycopg2.
+POSTGRES_DATABASE = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.getenv('POSTGRES_DB'),
+    'USER': os.getenv('POSTGRES_USER', ''),
+    'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+    'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+    'PORT': os.getenv('POSTGRES_PORT', '6432'),
+    'CONN_MAX_AGE': CONN_MAX_AGE,
+    'DISABLE_SERVER_SIDE_CURSORS': True,
+}
+
+DATABASES = {
+    'default': POSTGRES_DATABASE if os.getenv('POSTGRES_DB') else
+    SQLITE_DATABASE,
+}
+
+if os.getenv('POSTGRES_DB'):
+    # Индекс FTS5 есть только в SQLite.
+    NOTES_SEARCH_BACKEND = 'notes.search.SimpleSearchBackend'
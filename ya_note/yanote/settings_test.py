@@ -0,0 +1,40 @@
+"""
+Настройки для тестов и замеров производительности.
+
+Всё, что не проверяется тестами, заменено на самое быстрое: БД и кеш
+в памяти, сессии в подписанных cookie, MD5 вместо медленного хешера
+паролей, без middleware, которые только добавляют заголовки.
+Тест одновременного создания заметок из потоков требует БД в файле
+и с этими настройками пропускается.
+"""
+from .settings import *  # noqa: F401, F403
+from .settings import MIDDLEWARE
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'file:yanote?mode=memory&cache=shared',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    )
+]
@@ -0,0 +1,37 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite с настройками для одновременной записи из нескольких процессов.
+
+    Дополнительные ключи OPTIONS:
+    pragmas — PRAGMA, которые выполняются при каждом подключении;
+    transaction_mode — режим BEGIN для atomic, например IMMEDIATE.
+    С IMMEDIATE транзакция сразу берёт блокировку записи и ждёт её
+    busy_timeout, а не падает с «database is locked», когда две
+    транзакции одновременно пытаются перейти от чтения к записи.
+    """
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = settings_dict.get('OPTIONS', {})
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = options.get('transaction_mode')
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            return super()._start_transaction_under_autocommit()
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')